@@ -0,0 +1,182 @@
+"""Synthetic catalog, user and order seeding for the benchmarks and generate_data.py.
+
+Rows go in with batched multi-row INSERTs on a plain connection, bypassing the ORM,
+or with COPY on Postgres, so millions of rows load in minutes rather than hours.
+"""
+import csv
+import io
+import random
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from sqlalchemy import insert, select, text
+
+from models.category import Category
+from models.order import Order, OrderItem, OrderStatus
+from models.product import Product
+from models.user import User
+
+ADJECTIVES = ["Fresh", "Organic", "Ripe", "Local", "Crunchy", "Sweet", "Frozen", "Premium", "Wild", "Smoked"]
+NOUNS = [
+    "Apple", "Banana", "Strawberry", "Carrot", "Broccoli", "Spinach", "Tomato", "Potato", "Onion", "Garlic",
+    "Salmon", "Chicken", "Cheddar", "Yogurt", "Bread", "Rice", "Pasta", "Coffee", "Orange", "Mango",
+]
+UNITS = ["piece", "kg", "bunch", "pack", "dozen"]
+
+def bulk_insert(conn, model, rows):
+    """Insert a batch of row dicts: COPY on Postgres, an executemany INSERT elsewhere"""
+    if not rows:
+        return
+    if conn.dialect.name == "postgresql":
+        _copy_rows(conn, model.__table__, rows)
+    else:
+        conn.execute(insert(model), rows)
+
+def _copy_rows(conn, table, rows):
+    # COPY skips SQLAlchemy, so fill in the Python-side column defaults INSERT would have applied
+    defaults = {}
+    for column in table.columns:
+        default = column.default
+        if column.name in rows[0] or default is None:
+            continue
+        if default.is_scalar:
+            defaults[column.name] = default.arg
+        elif default.is_callable:
+            defaults[column.name] = default.arg(None)
+    columns = list(rows[0]) + list(defaults)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(["" if value is None else value for value in (*row.values(), *defaults.values())])
+    statement = f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    cursor = conn.connection.driver_connection.cursor()
+    try:
+        if hasattr(cursor, "copy_expert"):  # psycopg2
+            buffer.seek(0)
+            cursor.copy_expert(statement, buffer)
+        else:  # psycopg 3
+            with cursor.copy(statement) as copy:
+                copy.write(buffer.getvalue())
+    finally:
+        cursor.close()
+
+def reset_sequences(conn, *models):
+    """Move Postgres id sequences past rows inserted with explicit ids"""
+    if conn.dialect.name != "postgresql":
+        return
+    for model in models:
+        table = model.__tablename__
+        conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                          f"(SELECT coalesce(max(id), 0) + 1 FROM {table}), false)"))
+
+def seed_categories(conn, roots=10, children_per_root=8, grandchildren_per_child=3):
+    """Create a three-level category tree with materialized paths; returns the leaf category ids"""
+    leaves = []
+    next_id = 1
+    rows = []
+    for r in range(roots):
+        root_id = next_id
+        next_id += 1
+        rows.append({"id": root_id, "name": f"Department {r}", "slug": f"dept-{r}", "parent_id": None,
+                     "path": f"/{root_id}/", "depth": 0})
+        for c in range(children_per_root):
+            child_id = next_id
+            next_id += 1
+            child_path = f"/{root_id}/{child_id}/"
+            rows.append({"id": child_id, "name": f"Aisle {r}.{c}", "slug": f"aisle-{r}-{c}", "parent_id": root_id,
+                         "path": child_path, "depth": 1})
+            for g in range(grandchildren_per_child):
+                leaf_id = next_id
+                next_id += 1
+                rows.append({"id": leaf_id, "name": f"Shelf {r}.{c}.{g}", "slug": f"shelf-{r}-{c}-{g}",
+                             "parent_id": child_id, "path": f"{child_path}{leaf_id}/", "depth": 2})
+                leaves.append(leaf_id)
+    bulk_insert(conn, Category, rows)
+    reset_sequences(conn, Category)
+    return leaves
+
+def seed_products(conn, count, category_ids, batch_size=10000, seed=42, zipf_s=1.0):
+    """Insert ``count`` products spread over ``category_ids``.
+
+    Name words are Zipf-weighted, so a few (say "Fresh Apple") are everywhere
+    and most are rare, the way real catalogs and search terms are skewed.
+    """
+    rng = random.Random(seed)
+    adjectives, nouns = rng.sample(ADJECTIVES, len(ADJECTIVES)), rng.sample(NOUNS, len(NOUNS))
+    adjective_weights, noun_weights = zipf_cum_weights(len(adjectives), zipf_s), zipf_cum_weights(len(nouns), zipf_s)
+    start = datetime.utcnow() - timedelta(days=365)
+    for offset in range(0, count, batch_size):
+        batch = []
+        for i in range(offset, min(offset + batch_size, count)):
+            price = round(rng.uniform(0.5, 60.0), 2)
+            discounted = round(price * rng.uniform(0.5, 0.95), 2) if rng.random() < 0.2 else 0
+            created = start + timedelta(seconds=rng.randrange(365 * 24 * 3600))
+            batch.append({
+                "name": f"{rng.choices(adjectives, cum_weights=adjective_weights)[0]} "
+                        f"{rng.choices(nouns, cum_weights=noun_weights)[0]} {i}",
+                "slug": f"product-{i}",
+                "price": price,
+                "discounted_price": discounted,
+                "stock_quantity": rng.choice([0, rng.randint(1, 500)]),
+                "availability": rng.random() < 0.95,
+                "category_id": rng.choice(category_ids),
+                "unit": rng.choice(UNITS),
+                "created_at": created,
+                "updated_at": created,
+            })
+        bulk_insert(conn, Product, batch)
+
+def zipf_cum_weights(n, s=1.1):
+    """Cumulative Zipf weights for ranks 1..n, for random.choices(cum_weights=...)"""
+    return list(accumulate(1 / rank ** s for rank in range(1, n + 1)))
+
+def seed_users(conn, count, hashed_password, batch_size=10000):
+    """Insert ``count`` shoppers plus an admin, all sharing one password hash; returns the shopper ids.
+
+    Hashing a password per user would take minutes at bcrypt cost, and logins are
+    not what these datasets measure.
+    """
+    bulk_insert(conn, User, [{"email": "admin@bench.local", "username": "bench-admin",
+                              "hashed_password": hashed_password, "is_active": True, "is_admin": True}])
+    for offset in range(0, count, batch_size):
+        bulk_insert(conn, User, [
+            {"email": f"user{i}@bench.local", "username": f"user{i}", "hashed_password": hashed_password,
+             "is_active": True, "is_admin": False}
+            for i in range(offset, min(offset + batch_size, count))
+        ])
+    return [user_id for (user_id,) in conn.execute(select(User.id).where(User.is_admin == False))]
+
+def seed_orders(conn, count, user_ids, max_items=5, zipf_s=1.1, batch_size=5000, seed=42):
+    """Insert ``count`` orders whose products follow a Zipf distribution.
+
+    Popularity ranks are shuffled over the catalog so best sellers aren't simply
+    the lowest ids. Order ids are assigned here so items can be batched with them.
+    """
+    rng = random.Random(seed)
+    products = list(conn.execute(select(Product.id, Product.price)))
+    rng.shuffle(products)
+    cum_weights = zipf_cum_weights(len(products), zipf_s)
+    next_id = (conn.execute(select(Order.id).order_by(Order.id.desc()).limit(1)).scalar() or 0) + 1
+    start = datetime.utcnow() - timedelta(days=180)
+    statuses = [OrderStatus.DELIVERED.value] * 14 + [OrderStatus.SHIPPED.value] * 3 + \
+               [OrderStatus.PENDING.value] * 2 + [OrderStatus.CANCELLED.value]
+    for offset in range(0, count, batch_size):
+        orders, items = [], []
+        for order_id in range(next_id + offset, next_id + min(offset + batch_size, count)):
+            created = start + timedelta(seconds=rng.randrange(180 * 24 * 3600))
+            chosen = {product_id: price for product_id, price in
+                      rng.choices(products, cum_weights=cum_weights, k=rng.randint(1, max_items))}
+            total = 0.0
+            for product_id, price in chosen.items():
+                quantity = rng.randint(1, 3)
+                total += price * quantity
+                items.append({"order_id": order_id, "product_id": product_id, "quantity": quantity, "unit_price": price,
+                              "created_at": created, "updated_at": created})
+            orders.append({"id": order_id, "user_id": rng.choice(user_ids), "status": rng.choice(statuses),
+                           "total_amount": round(total, 2), "address": f"{rng.randint(1, 999)} Market St",
+                           "city": "Springfield", "state": "IL", "postal_code": f"{rng.randint(10000, 99999)}",
+                           "country": "US", "phone": f"555-{rng.randint(1000, 9999)}",
+                           "created_at": created, "updated_at": created})
+        bulk_insert(conn, Order, orders)
+        bulk_insert(conn, OrderItem, items)
+    reset_sequences(conn, Order)
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""HTTP load test: scenario mixes at set concurrency levels against a seeded dataset.
+
+Seeds the database named by DATABASE_URL (default: a local SQLite file) on
+first run, then drives the app with httpx's async client, in process through
+ASGI or against a running server with --url. Reports RPS and p50/p95/p99 per
+endpoint and concurrency level, and writes them as JSON for later comparison.
+
+    python benchmarks/loadtest.py --products 100000 --concurrency 1,8,32 --duration 20
+    python benchmarks/loadtest.py --mix browse=6,search=2,checkout=2 --compare benchmarks/results/before.json
+    DATABASE_URL=postgresql://... python benchmarks/loadtest.py --url http://localhost:8000
+
+Needs httpx: pip install -r requirements-dev.txt
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+# Add the project root to sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench_load.db")
+
+import httpx
+from sqlalchemy import select
+
+from database.database import Base, SessionLocal, engine
+from core.security import create_access_token, get_password_hash
+from models.category import Category
+from models.order import Order
+from models.product import Product
+from models.user import User
+from main import app
+from benchmarks.dataset import ADJECTIVES, NOUNS, seed_categories, seed_orders, seed_products, seed_users
+
+DEFAULT_MIX = "browse=50,search=20,cart=15,checkout=10,admin=5"
+SORTS = ["newest", "price_asc", "price_desc", "discount", "name"]
+
+def ensure_dataset(products, users, orders):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        existing = db.query(Product.id).count()
+    finally:
+        db.close()
+    if existing:
+        print(f"Reusing existing dataset ({existing} products)")
+        return
+
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        leaves = seed_categories(conn)
+        seed_products(conn, products, leaves)
+        user_ids = seed_users(conn, users, get_password_hash("benchmark-password"))
+        seed_orders(conn, orders, user_ids)
+    # Category stats, popularity and the change feed are backfilled by app startup
+    print(f"Seeded {products} products, {users} users and {orders} orders in {time.perf_counter() - started:.1f}s")
+
+class Context:
+    """What the scenarios pick from, loaded once from the database"""
+
+    def __init__(self):
+        db = SessionLocal()
+        try:
+            self.products = db.execute(select(Product.id, Product.slug).where(Product.availability == True).limit(20000)).all()
+            # Checkout only buys what is in stock, or most orders would be 400s
+            self.in_stock = [product_id for (product_id,) in db.execute(
+                select(Product.id).where(Product.availability == True, Product.stock_quantity >= 100).limit(20000))]
+            self.categories = [slug for (slug,) in db.execute(select(Category.slug))]
+            shoppers = [user_id for (user_id,) in db.execute(select(User.id).where(User.is_admin == False).limit(200))]
+            admin_id = db.execute(select(User.id).where(User.is_admin == True).limit(1)).scalar()
+            self.order_ids = [order_id for (order_id,) in db.execute(select(Order.id).limit(5000))]
+        finally:
+            db.close()
+        if not self.in_stock or not shoppers or admin_id is None:
+            sys.exit("Dataset needs products, shoppers and an admin; point DATABASE_URL at an empty database to reseed")
+        # Minted directly rather than logging in, so bcrypt isn't part of every run
+        self.shopper_tokens = [{"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"} for user_id in shoppers]
+        self.admin_token = {"Authorization": f"Bearer {create_access_token({'sub': str(admin_id)})}"}
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}
+        self.statuses = {}
+
+    async def call(self, client, method, route, url, **kwargs):
+        label = f"{method} {route}"
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError:
+            response, status = None, 599
+        self.latencies.setdefault(label, []).append(time.perf_counter() - start)
+        counts = self.statuses.setdefault(label, {})
+        counts[status] = counts.get(status, 0) + 1
+        return response
+
+async def browse(client, rec, ctx, rng):
+    await rec.call(client, "GET", "/bootstrap", "/bootstrap")
+    await rec.call(client, "GET", "/products/store", "/products/store",
+                   params={"category": rng.choice(ctx.categories), "sort": rng.choice(SORTS), "limit": 24})
+    await rec.call(client, "GET", "/products/{product_id_or_slug}", f"/products/{rng.choice(ctx.products)[1]}")
+
+async def search(client, rec, ctx, rng):
+    word = rng.choice(NOUNS).lower()
+    await rec.call(client, "GET", "/products/suggest", "/products/suggest", params={"q": word[:rng.randint(1, 4)]})
+    # Drop one letter to exercise typo tolerance
+    typo = word[:len(word) // 2] + word[len(word) // 2 + 1:]
+    await rec.call(client, "GET", "/products/search", "/products/search", params={"q": f"{rng.choice(ADJECTIVES)} {typo}"})
+
+async def cart(client, rec, ctx, rng):
+    product_id = rng.choice(ctx.products)[0]
+    await rec.call(client, "GET", "/products/{product_id_or_slug}", f"/products/{product_id}")
+    await rec.call(client, "GET", "/products/{product_id}/related", f"/products/{product_id}/related")
+    await rec.call(client, "GET", "/coupon/show", "/coupon/show")
+
+async def checkout(client, rec, ctx, rng):
+    headers = rng.choice(ctx.shopper_tokens)
+    items = [{"product_id": product_id, "quantity": 1, "unit_price": 1.0}
+             for product_id in rng.sample(ctx.in_stock, rng.randint(1, 3))]
+    order = {"address": "1 Main St", "city": "Springfield", "state": "IL", "postal_code": "62701",
+             "country": "US", "phone": "555-0100", "items": items}
+    response = await rec.call(client, "POST", "/orders/", "/orders/", json=order, headers=headers)
+    if response is not None and response.status_code == 201:
+        await rec.call(client, "GET", "/orders/{order_id}", f"/orders/{response.json()['id']}", headers=headers)
+
+async def admin(client, rec, ctx, rng):
+    await rec.call(client, "GET", "/orders/", "/orders/", params={"limit": 50}, headers=ctx.admin_token)
+    product_id = rng.choice(ctx.products)[0]
+    await rec.call(client, "PUT", "/products/{product_id}", f"/products/{product_id}",
+                   json={"price": round(rng.uniform(1, 50), 2)}, headers=ctx.admin_token)
+
+SCENARIOS = {"browse": browse, "search": search, "cart": cart, "checkout": checkout, "admin": admin}
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in SCENARIOS:
+            sys.exit(f"Unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+async def run_level(client, ctx, mix, concurrency, duration, seed):
+    rec = Recorder()
+    names, weights = list(mix), list(mix.values())
+    deadline = time.perf_counter() + duration
+
+    async def virtual_user(index):
+        rng = random.Random(seed * 1000 + index)
+        while time.perf_counter() < deadline:
+            await SCENARIOS[rng.choices(names, weights)[0]](client, rec, ctx, rng)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(virtual_user(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    endpoints = {}
+    for label, latencies in sorted(rec.latencies.items()):
+        ordered = sorted(latencies)
+        endpoints[label] = {
+            "count": len(ordered),
+            "rps": round(len(ordered) / elapsed, 1),
+            "p50_ms": round(percentile(ordered, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(ordered, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(ordered, 0.99) * 1000, 2),
+            "max_ms": round(ordered[-1] * 1000, 2),
+            "statuses": {str(status): count for status, count in sorted(rec.statuses[label].items())},
+        }
+    total = sum(endpoint["count"] for endpoint in endpoints.values())
+    errors = sum(count for counts in rec.statuses.values() for status, count in counts.items() if status >= 500)
+    return {"concurrency": concurrency, "duration_s": round(elapsed, 2), "requests": total,
+            "rps": round(total / elapsed, 1), "server_errors": errors, "endpoints": endpoints}
+
+def print_level(level):
+    print(f"\nconcurrency {level['concurrency']}: {level['requests']} requests, {level['rps']} req/s, "
+          f"{level['server_errors']} server errors")
+    print(f"  {'endpoint':<40} {'count':>7} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  statuses")
+    for label, e in level["endpoints"].items():
+        statuses = " ".join(f"{status}:{count}" for status, count in e["statuses"].items())
+        print(f"  {label:<40} {e['count']:>7} {e['rps']:>8} {e['p50_ms']:>8} {e['p95_ms']:>8} {e['p99_ms']:>8}  {statuses}")
+
+def print_comparison(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {level["concurrency"]: level for level in json.load(f)["levels"]}
+    print(f"\nCompared with {baseline_path} (p95 and rps, negative p95 change is better):")
+    for level in results["levels"]:
+        before = baseline.get(level["concurrency"])
+        if before is None:
+            print(f"  concurrency {level['concurrency']}: not in the earlier run")
+            continue
+        print(f"  concurrency {level['concurrency']}: rps {before['rps']} -> {level['rps']}")
+        for label, e in level["endpoints"].items():
+            old = before["endpoints"].get(label)
+            if old and old["p95_ms"]:
+                change = (e["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100
+                print(f"    {label:<40} p95 {old['p95_ms']:>8} -> {e['p95_ms']:>8} ms ({change:+.0f}%)")
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+async def run(args):
+    ctx = Context()
+    mix = parse_mix(args.mix)
+    levels = [int(level) for level in args.concurrency.split(",")]
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30)
+    else:
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=30)
+
+    results = {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(), "commit": git_commit(),
+            "target": args.url or "in-process ASGI", "database": engine.dialect.name,
+            "products": len(ctx.products), "mix": mix, "python": platform.python_version(),
+        },
+        "levels": [],
+    }
+    async with client:
+        if not args.url:
+            # Run the app's startup (backfills, search index) as a server would
+            async with app.router.lifespan_context(app):
+                for level in levels:
+                    await run_level(client, ctx, mix, level, min(args.warmup, args.duration), args.seed)
+                    results["levels"].append(await run_level(client, ctx, mix, level, args.duration, args.seed))
+                    print_level(results["levels"][-1])
+        else:
+            for level in levels:
+                await run_level(client, ctx, mix, level, min(args.warmup, args.duration), args.seed)
+                results["levels"].append(await run_level(client, ctx, mix, level, args.duration, args.seed))
+                print_level(results["levels"][-1])
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=10000, help="Catalog size when seeding")
+    parser.add_argument("--users", type=int, default=1000, help="Shoppers when seeding")
+    parser.add_argument("--orders", type=int, default=20000, help="Order history when seeding")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Scenario weights, e.g. browse=50,search=20")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated virtual user counts")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds measured per concurrency level")
+    parser.add_argument("--warmup", type=float, default=2, help="Unmeasured seconds before each level")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--url", help="Load a running server instead of the app in process")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/loadtest-<time>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    ensure_dataset(args.products, args.users, args.orders)
+    results = asyncio.run(run(args))
+
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), "results",
+                                         f"loadtest-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+    if args.compare:
+        print_comparison(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
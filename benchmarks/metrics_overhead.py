@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Benchmark of MetricsMiddleware overhead per request.
+
+Times the middleware around a no-op ASGI app, which isolates its own cost, then
+reports that cost against a FastAPI app driven straight through ASGI (no
+sockets, so nothing hides it) on a trivial route and on one returning a
+50-product listing. Comparing full requests with and without the middleware
+directly drowns a few microseconds in run-to-run noise.
+
+    python benchmarks/metrics_overhead.py --requests 5000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Add the project root to sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+
+from core.metrics import MetricsMiddleware, RequestMetrics
+
+
+def build_app():
+    app = FastAPI()
+    listing = [{"id": i, "name": f"Product {i}", "price": 1.5 * i, "image": [f"/img/{i}.jpg"]} for i in range(50)]
+
+    @app.get("/ping")
+    def ping():
+        return {"ok": True}
+
+    @app.get("/products/{product_id_or_slug}")
+    def products(product_id_or_slug: str):
+        return listing
+
+    return app
+
+
+async def drive(app, path, requests):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": b"", "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / requests * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    async def noop(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    bare = min(asyncio.run(drive(noop, "/ping", args.requests * 10)) for _ in range(5))
+    wrapped = min(asyncio.run(drive(MetricsMiddleware(noop, RequestMetrics()), "/ping", args.requests * 10)) for _ in range(5))
+    print(f"{'middleware alone':<18} {wrapped - bare:5.2f} us per request")
+
+    app = build_app()
+    for path in ("/ping", "/products/apple"):
+        baseline = min(asyncio.run(drive(app, path, args.requests)) for _ in range(5))
+        print(f"{path:<18} {baseline:7.2f} us per request, middleware adds {(wrapped - bare) / baseline * 100:4.1f}%")
+
+if __name__ == "__main__":
+    main()
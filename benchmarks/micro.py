@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""Microbenchmarks of serialization, auth and query-building hot paths, checked against a stored baseline.
+
+Each benchmark is timed with timeit: the iteration count is calibrated to about
+0.2s, then repeated --rounds times, and per-call min/median/mean are reported.
+Regressions are judged on the median.
+
+    python benchmarks/micro.py                         # run and print
+    python benchmarks/micro.py -k transform            # only matching benchmarks
+    python benchmarks/micro.py --save                  # record benchmarks/baselines/micro.json
+    python benchmarks/micro.py --compare --threshold 15  # exit 1 if anything got >15% slower
+
+Baselines are machine specific; record one on the machine you compare on.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import timeit
+from datetime import datetime, timezone
+
+# Add the project root to sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from jose import jwt
+
+from core.security import ALGORITHM, SECRET_KEY, create_access_token, get_password_hash
+from database.database import SessionLocal
+from models.category import Category
+from models.order import Order, OrderItem
+from models.product import Product
+from routers.categories import transform_category, transform_child_category
+from routers.products import store_products_query, transform_product
+from schemas.order import Order as OrderSchema
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "micro.json")
+NOW = datetime(2025, 6, 1, tzinfo=timezone.utc)
+
+BENCHMARKS = {}
+
+def benchmark(name):
+    """Register a setup function returning the zero-argument callable to time"""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+def _category(id, parent=None):
+    category = Category(id=id, name=f"Category {id}", slug=f"category-{id}", description="Fresh produce",
+                        image_url=f"https://cdn.example.com/c/{id}.png", parent_id=parent.id if parent else None,
+                        path=f"/{id}/", depth=0, created_at=NOW, updated_at=NOW)
+    category.children = []
+    return category
+
+def _product(id, category):
+    return Product(id=id, name=f"Organic Apple {id}", slug=f"organic-apple-{id}", description="Crisp and sweet",
+                   price=3.49, discounted_price=2.99, discount_percentage=14, stock_quantity=120,
+                   availability=True, image_url=f"https://cdn.example.com/p/{id}.jpg", category_id=category.id,
+                   category=category, created_at=NOW, updated_at=NOW)
+
+@benchmark("transform_product")
+def bench_transform_product():
+    product = _product(1, _category(1))
+    return lambda: transform_product(product)
+
+@benchmark("transform_category")
+def bench_transform_category():
+    category = _category(1)
+    category.children = [_category(i, category) for i in range(2, 10)]
+    return lambda: transform_category(category)
+
+@benchmark("transform_child_category")
+def bench_transform_child_category():
+    category = _category(2, _category(1))
+    return lambda: transform_child_category(category)
+
+@benchmark("order_schema_serialize")
+def bench_order_schema():
+    # What FastAPI does for response_model=OrderSchema: validate from attributes, then dump to JSON
+    items = [OrderItem(id=i, order_id=1, product_id=i, quantity=2, unit_price=3.49, created_at=NOW, updated_at=NOW)
+             for i in range(1, 6)]
+    order = Order(id=1, user_id=1, status="pending", total_amount=34.9, address="1 Main St", city="Springfield",
+                  state="IL", postal_code="62701", country="US", phone="555-0100", items=items,
+                  created_at=NOW, updated_at=NOW)
+    return lambda: OrderSchema.model_validate(order).model_dump_json()
+
+@benchmark("create_access_token")
+def bench_create_access_token():
+    return lambda: create_access_token({"sub": "1"})
+
+@benchmark("jwt_decode")
+def bench_jwt_decode():
+    token = create_access_token({"sub": "1"})
+    return lambda: jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+@benchmark("get_password_hash")
+def bench_get_password_hash():
+    return lambda: get_password_hash("correct horse battery staple")
+
+def _store_query(**filters):
+    # Construction only: executing hits SQLAlchemy's compiled cache, so every request pays this part
+    db = SessionLocal()
+    return lambda: store_products_query(db, **filters).statement
+
+@benchmark("store_query_default")
+def bench_store_query_default():
+    return _store_query()
+
+@benchmark("store_query_categories")
+def bench_store_query_categories():
+    return _store_query(category_filters=["fruits", "12", "vegetables"])
+
+@benchmark("store_query_all_filters")
+def bench_store_query_all_filters():
+    return _store_query(category_filters=["fruits"], min_price=1.0, max_price=20.0,
+                       in_stock=True, discounted_only=True, slug="organic-apple-1")
+
+def measure(func, rounds):
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    times = [total / number * 1_000_000 for total in timer.repeat(repeat=rounds, number=number)]
+    return {"min_us": round(min(times), 3), "median_us": round(statistics.median(times), 3),
+            "mean_us": round(statistics.mean(times), 3), "iterations": number, "rounds": rounds}
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(results, baseline_path, threshold):
+    """Print the change against the baseline; return the names that slowed down beyond threshold percent"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    if baseline["meta"].get("machine") != results["meta"]["machine"]:
+        print(f"Note: baseline was recorded on {baseline['meta'].get('machine')}, not this machine")
+    regressions = []
+    print(f"\n{'benchmark':<28} {'baseline us':>12} {'now us':>12} {'change':>8}")
+    for name, now in results["benchmarks"].items():
+        before = baseline["benchmarks"].get(name)
+        if before is None:
+            print(f"{name:<28} {'-':>12} {now['median_us']:>12.3f}      new")
+            continue
+        change = (now["median_us"] - before["median_us"]) / before["median_us"] * 100
+        flag = "  REGRESSION" if change > threshold else ""
+        print(f"{name:<28} {before['median_us']:>12.3f} {now['median_us']:>12.3f} {change:>+7.1f}%{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-k", dest="pattern", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--save", nargs="?", const=DEFAULT_BASELINE, help="Write results as the baseline")
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE, help="Compare with a baseline")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Percent slowdown counted as a regression")
+    args = parser.parse_args()
+
+    results = {
+        "meta": {
+            "recorded_at": datetime.now(timezone.utc).isoformat(), "commit": git_commit(),
+            "python": platform.python_version(), "machine": f"{platform.node()} {platform.machine()}",
+        },
+        "benchmarks": {},
+    }
+    print(f"{'benchmark':<28} {'min us':>12} {'median us':>12} {'mean us':>12}")
+    for name, setup in BENCHMARKS.items():
+        if args.pattern and args.pattern not in name:
+            continue
+        stats = measure(setup(), args.rounds)
+        results["benchmarks"][name] = stats
+        print(f"{name:<28} {stats['min_us']:>12.3f} {stats['median_us']:>12.3f} {stats['mean_us']:>12.3f}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline written to {args.save}")
+    if args.compare and regressions:
+        print(f"\n{len(regressions)} benchmark(s) more than {args.threshold:g}% slower: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
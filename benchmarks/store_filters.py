@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Latency of /products/store filter combinations on a large seeded catalog.
+
+Seeds the database named by DATABASE_URL (default: a local SQLite file) with a
+synthetic catalog on first run, then reports p50/p95 per scenario and fails if
+any p95 exceeds the target.
+
+    DATABASE_URL=postgresql://... python benchmarks/store_filters.py --products 400000
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+# Add the project root to sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench_store.db")
+
+from fastapi.testclient import TestClient
+
+from database.database import Base, SessionLocal, engine
+from core.category_stats import refresh_category_stats
+from models.product import Product
+from main import app
+from benchmarks.dataset import seed_categories, seed_products
+
+SCENARIOS = {
+    "default": "/products/store",
+    "category": "/products/store?category=dept-3",
+    "categories+price": "/products/store?categories=dept-1,aisle-2-3&min_price=5&max_price=20",
+    "price range sorted": "/products/store?min_price=10&max_price=12&sort=price_asc",
+    "in stock, discounted": "/products/store?in_stock=true&discounted_only=true&sort=discount",
+    "everything": "/products/store?categories=dept-4&min_price=1&max_price=30&in_stock=true&discounted_only=true&sort=price_desc",
+}
+
+def ensure_dataset(products):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        existing = db.query(Product.id).count()
+    finally:
+        db.close()
+    if existing >= products:
+        print(f"Reusing existing dataset ({existing} products)")
+        return
+    if existing:
+        sys.exit(f"Database already has {existing} products; point DATABASE_URL at an empty database")
+
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        leaves = seed_categories(conn)
+        seed_products(conn, products, leaves)
+    db = SessionLocal()
+    try:
+        refresh_category_stats(db)
+        db.commit()
+    finally:
+        db.close()
+    print(f"Seeded {products} products in {time.perf_counter() - started:.1f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=400000)
+    parser.add_argument("--requests", type=int, default=50, help="Requests per scenario")
+    parser.add_argument("--target-p95-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    ensure_dataset(args.products)
+
+    failed = False
+    with TestClient(app) as client:
+        for name, url in SCENARIOS.items():
+            client.get(url)  # warm-up
+            timings = []
+            for _ in range(args.requests):
+                started = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+                response.raise_for_status()
+            timings.sort()
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            status = "ok" if p95 <= args.target_p95_ms else "SLOW"
+            failed = failed or status != "ok"
+            print(f"{name:<24} p50 {statistics.median(timings):7.1f} ms   p95 {p95:7.1f} ms   {status}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Build the "frequently bought together" table from order history.
+
+    python build_related_products.py           # only orders placed since the last run
+    python build_related_products.py --full    # recount everything, e.g. to drop cancelled orders
+
+Orders are turned into a sparse order x product matrix X in batches; X.T @ X
+counts, for every pair of products, the orders containing both. The running
+co-occurrence matrix and the last order id counted are saved to --matrix between
+runs, so an incremental run only multiplies the new orders and only rewrites the
+neighbours of products that appeared in them.
+
+Needs NumPy and SciPy, which the API itself does not: pip install -r requirements-dev.txt
+"""
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    sys.exit("build_related_products.py needs NumPy and SciPy: pip install -r requirements-dev.txt")
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main  # noqa: F401  Registers every model with the mapper
+from database.database import SessionLocal
+from models.order import Order, OrderItem, OrderStatus
+from models.product import ProductRelated
+
+def load_matrix(path):
+    """The saved co-occurrence matrix and last counted order id, or an empty start"""
+    if not os.path.exists(path):
+        return sparse.csr_matrix((0, 0), dtype=np.int32), 0
+    saved = np.load(path)
+    matrix = sparse.csr_matrix((saved["data"], saved["indices"], saved["indptr"]), shape=tuple(saved["shape"]))
+    return matrix, int(saved["last_order_id"])
+
+def save_matrix(path, matrix, last_order_id):
+    np.savez_compressed(path, data=matrix.data, indices=matrix.indices, indptr=matrix.indptr,
+                        shape=np.array(matrix.shape), last_order_id=np.array(last_order_id))
+
+def order_batches(db, after_order_id, placed_before, batch_orders):
+    """(order_ids, product_ids) arrays for orders in id order, batch_orders orders at a time"""
+    last_id = after_order_id
+    while True:
+        upper = db.query(Order.id)\
+            .filter(Order.id > last_id, Order.created_at < placed_before)\
+            .order_by(Order.id)\
+            .offset(batch_orders - 1)\
+            .limit(1)\
+            .scalar()
+        query = db.query(OrderItem.order_id, OrderItem.product_id)\
+            .join(Order, Order.id == OrderItem.order_id)\
+            .filter(Order.id > last_id, Order.created_at < placed_before,
+                    Order.status != OrderStatus.CANCELLED.value)
+        if upper is not None:
+            query = query.filter(Order.id <= upper)
+        rows = np.array(query.all(), dtype=np.int64).reshape(-1, 2)
+        if upper is None:
+            # Last, partial batch: the watermark moves to the newest settled order, counted or not
+            newest = db.query(Order.id).filter(Order.id > last_id, Order.created_at < placed_before)\
+                .order_by(Order.id.desc()).limit(1).scalar()
+            yield rows[:, 0], rows[:, 1], newest or last_id
+            return
+        yield rows[:, 0], rows[:, 1], upper
+        last_id = upper
+
+def cooccurrence(order_ids, product_ids, size):
+    """Pairwise counts of orders containing both products, diagonal cleared"""
+    _, rows = np.unique(order_ids, return_inverse=True)
+    incidence = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.int32), (rows, product_ids)),
+        shape=(rows.max() + 1 if len(rows) else 0, size),
+    )
+    incidence.data[:] = 1  # The same product twice in one order counts once
+    counts = (incidence.T @ incidence).tocsr()
+    counts.setdiag(0)
+    counts.eliminate_zeros()
+    return counts
+
+def grow(matrix, size):
+    if matrix.shape[0] < size:
+        matrix = matrix.copy()
+        matrix.resize((size, size))
+    return matrix
+
+def top_neighbours(matrix, product_id, k):
+    start, end = matrix.indptr[product_id], matrix.indptr[product_id + 1]
+    related, scores = matrix.indices[start:end], matrix.data[start:end]
+    if len(scores) > k:
+        keep = np.argpartition(-scores, k - 1)[:k]
+        related, scores = related[keep], scores[keep]
+    return [{"product_id": product_id, "related_id": int(r), "score": int(s)} for r, s in zip(related, scores)]
+
+def write_neighbours(db, matrix, product_ids, k, chunk=500, replace_all=False):
+    """Rewrite the neighbours of product_ids, committing per chunk.
+
+    With replace_all every existing row goes too, and the delete and the whole
+    rewrite share one transaction: readers keep the old table until it commits,
+    and a failed run leaves it as it was.
+    """
+    product_ids = [int(product_id) for product_id in product_ids]
+    if replace_all:
+        db.query(ProductRelated).delete(synchronize_session=False)
+    for i in range(0, len(product_ids), chunk):
+        part = product_ids[i:i + chunk]
+        if not replace_all:
+            db.query(ProductRelated).filter(ProductRelated.product_id.in_(part)).delete(synchronize_session=False)
+        rows = []
+        for product_id in part:
+            if product_id < matrix.shape[0]:
+                rows.extend(top_neighbours(matrix, product_id, k))
+        db.bulk_insert_mappings(ProductRelated, rows)
+        if not replace_all:
+            db.commit()
+    db.commit()
+
+def build_related_products(matrix_path, full=False, top_k=20, batch_orders=50000, settle_minutes=5):
+    matrix, last_order_id = (sparse.csr_matrix((0, 0), dtype=np.int32), 0) if full else load_matrix(matrix_path)
+    # Orders commit items in their own transaction, so leave the newest few minutes for the next run
+    placed_before = datetime.now(timezone.utc) - timedelta(minutes=settle_minutes)
+    touched = set()
+
+    db = SessionLocal()
+    try:
+        for order_ids, product_ids, last_order_id in order_batches(db, last_order_id, placed_before, batch_orders):
+            if len(product_ids):
+                size = max(matrix.shape[0], int(product_ids.max()) + 1)
+                matrix = grow(matrix, size) + cooccurrence(order_ids, product_ids, size)
+                touched.update(np.unique(product_ids).tolist())
+
+        write_neighbours(db, matrix, sorted(touched), top_k, replace_all=full)
+    finally:
+        db.close()
+
+    save_matrix(matrix_path, matrix.tocsr(), last_order_id)
+    print(f"Counted orders up to id {last_order_id}; refreshed neighbours of {len(touched)} products "
+          f"({matrix.nnz} product pairs in {matrix_path})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the product_related table from order history")
+    parser.add_argument("--full", action="store_true", help="Recount every order instead of continuing from the last run")
+    parser.add_argument("--matrix", default="related_products.npz", help="Where the co-occurrence matrix is kept between runs")
+    parser.add_argument("--top-k", type=int, default=20, help="Neighbours kept per product")
+    parser.add_argument("--batch-orders", type=int, default=50000, help="Orders multiplied per batch")
+    parser.add_argument("--settle-minutes", type=int, default=5, help="Skip orders newer than this")
+    args = parser.parse_args()
+    build_related_products(args.matrix, args.full, args.top_k, args.batch_orders, args.settle_minutes)
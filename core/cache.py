@@ -0,0 +1,301 @@
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import threading
+import time
+from collections import OrderedDict
+from enum import Enum
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
+
+from core.compression import precompressed_response
+from core.config import settings
+from database.database import upsert
+from models.cache_version import CacheVersion
+
+def current_version(db: Session, name: str) -> int:
+    version = db.query(CacheVersion.version).filter(CacheVersion.name == name).scalar()
+    return version or 0
+
+def bump_version(db: Session, name: str) -> None:
+    """Mark a dataset as changed. Call inside the writing transaction, before commit.
+
+    The row stays locked until that commit, so keep bumps out of hot write paths.
+    """
+    upsert(db, CacheVersion, [{"name": name, "version": 1}], key=["name"],
+           update=lambda columns, excluded: {"version": columns.version + 1})
+
+class Snapshot:
+    """Immutable result of one cache build: the data, its encoded JSON body and an ETag"""
+    __slots__ = ("version", "data", "body", "etag", "built_at", "variants")
+
+    def __init__(self, version: int, data: Any):
+        self.version = version
+        self.data = jsonable_encoder(data)
+        self.body = json.dumps(self.data, separators=(",", ":")).encode("utf-8")
+        self.etag = '"%s"' % hashlib.blake2b(self.body, digest_size=8).hexdigest()
+        self.built_at = time.monotonic()
+        self.variants = {}  # Content-Encoding -> compressed body, filled on first request
+
+# Every VersionedCache, for the hit/miss counters on /metrics
+CACHE_REGISTRY: List["VersionedCache"] = []
+
+class VersionedCache:
+    """Read-mostly data held in memory and rebuilt when its cache_versions row changes.
+
+    The version row is re-read at most every CACHE_VERSION_CHECK_SECONDS, so other
+    workers pick up a write within that window. ``ttl`` additionally rebuilds data that
+    goes stale with time alone (e.g. coupon date windows).
+
+    One thread at a time checks and rebuilds. Readers arriving meanwhile get the
+    previous snapshot (stale-while-revalidate) and only wait when there is none.
+    """
+
+    def __init__(self, name: str, loader: Callable[[Session], Any], ttl: Optional[float] = None):
+        self.name = name
+        self.loader = loader
+        self.ttl = ttl
+        self._snapshot: Optional[Snapshot] = None
+        self._checked_at = 0.0
+        self._invalidated = False
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        CACHE_REGISTRY.append(self)
+
+    def _is_fresh(self, snapshot: Optional[Snapshot], now: float) -> bool:
+        if snapshot is None or self._invalidated:
+            return False
+        if self.ttl is not None and now - snapshot.built_at >= self.ttl:
+            return False
+        return now - self._checked_at < settings.CACHE_VERSION_CHECK_SECONDS
+
+    def get(self, db: Session) -> Snapshot:
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot, time.monotonic()):
+            self.hits += 1
+            return snapshot
+        if not self._lock.acquire(blocking=snapshot is None):
+            # Another thread is checking or rebuilding; don't queue behind it
+            self.stale_hits += 1
+            return snapshot
+        try:
+            # Another thread may have rebuilt while we waited for the lock
+            snapshot = self._snapshot
+            now = time.monotonic()
+            if self._is_fresh(snapshot, now):
+                self.hits += 1
+                return snapshot
+            version = current_version(db, self.name)
+            expired = snapshot is not None and self.ttl is not None and now - snapshot.built_at >= self.ttl
+            if snapshot is None or snapshot.version != version or expired or self._invalidated:
+                self.misses += 1
+                snapshot = Snapshot(version, self.loader(db))
+                self._snapshot = snapshot
+                self._invalidated = False
+            else:
+                self.hits += 1
+            self._checked_at = now
+            return snapshot
+        finally:
+            self._lock.release()
+
+    def refresh(self, db: Session) -> Snapshot:
+        """Rebuild now and swap the snapshot in one assignment, e.g. right after a local write commits"""
+        with self._lock:
+            snapshot = Snapshot(current_version(db, self.name), self.loader(db))
+            self._snapshot = snapshot
+            self._invalidated = False
+            self._checked_at = time.monotonic()
+            return snapshot
+
+    def invalidate(self) -> None:
+        """Rebuild on the next read; until that finishes, concurrent readers still get the old snapshot"""
+        self._invalidated = True
+
+_MISSING = object()
+
+# Every single_flight-decorated function, for the counters on /metrics
+SINGLE_FLIGHT_REGISTRY: List["SingleFlight"] = []
+
+def _plain(value):
+    """Hashable form of a plain argument value, or _MISSING for objects such as sessions and users"""
+    if value is None or isinstance(value, (str, int, float, bool, Enum)):
+        return value
+    if isinstance(value, (list, tuple)):
+        items = tuple(_plain(item) for item in value)
+        return _MISSING if any(item is _MISSING for item in items) else items
+    return _MISSING
+
+def request_key(*args, **kwargs) -> Hashable:
+    """Default single_flight key: the plain-valued arguments, i.e. a handler's query and path parameters"""
+    parts = []
+    for value in args:
+        value = _plain(value)
+        if value is not _MISSING:
+            parts.append(value)
+    for name in sorted(kwargs):
+        value = _plain(kwargs[name])
+        if value is not _MISSING:
+            parts.append((name, value))
+    return tuple(parts)
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+class SingleFlight:
+    """Shares one in-flight call of a function among concurrent callers with the same key; see single_flight()"""
+
+    def __init__(self, func: Callable, stale_seconds: Optional[float], key: Callable[..., Hashable], maxsize: int):
+        self.func = func
+        self.name = f"{func.__module__}.{func.__qualname__}"
+        self.stale_seconds = stale_seconds
+        self.key = key
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, Any] = {}  # key -> _Flight, or an asyncio.Future for coroutines
+        self._results: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (result, finished at), LRU
+        self.computed = 0
+        self.shared = 0
+        self.stale = 0
+        SINGLE_FLIGHT_REGISTRY.append(self)
+
+    def _stale_seconds(self) -> float:
+        return settings.STALE_WHILE_REVALIDATE_SECONDS if self.stale_seconds is None else self.stale_seconds
+
+    def _stale_result(self, key):
+        """The last result for key if young enough to serve while it is recomputed; call with the lock held"""
+        entry = self._results.get(key)
+        if entry is not None and time.monotonic() - entry[1] <= self._stale_seconds():
+            self.stale += 1
+            return entry[0]
+        return _MISSING
+
+    def _remember(self, key, result):
+        """Keep the result for stale serving; call with the lock held"""
+        if self._stale_seconds() <= 0:
+            return
+        self._results[key] = (result, time.monotonic())
+        self._results.move_to_end(key)
+        while len(self._results) > self.maxsize:
+            self._results.popitem(last=False)
+
+    def call(self, *args, **kwargs):
+        key = self.key(*args, **kwargs)
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.computed += 1
+            else:
+                stale = self._stale_result(key)
+                if stale is not _MISSING:
+                    return stale
+                self.shared += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = self.func(*args, **kwargs)
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                if flight.error is None:
+                    self._remember(key, flight.result)
+            flight.done.set()
+        return flight.result
+
+    async def call_async(self, *args, **kwargs):
+        key = self.key(*args, **kwargs)
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                if flight is None:
+                    flight = self._flights[key] = asyncio.get_running_loop().create_future()
+                    self.computed += 1
+                    break
+                stale = self._stale_result(key)
+                if stale is not _MISSING:
+                    return stale
+                self.shared += 1
+            try:
+                return await asyncio.shield(flight)
+            except asyncio.CancelledError:
+                if not flight.cancelled():
+                    raise  # This caller was cancelled, not the one computing
+                # The caller computing it went away; try again, possibly as the new leader
+
+        try:
+            result = await self.func(*args, **kwargs)
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except BaseException as exc:
+            flight.set_exception(exc)
+            flight.exception()  # Mark retrieved, so a flight nobody else awaited isn't logged
+            raise
+        else:
+            flight.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._flights[key]
+                if flight.done() and not flight.cancelled() and flight.exception() is None:
+                    self._remember(key, flight.result())
+
+def single_flight(stale_seconds: Optional[float] = None, key: Callable[..., Hashable] = request_key, maxsize: int = 256):
+    """Decorator coalescing concurrent identical calls of a function, sync or async, into one.
+
+    Calls with the same key while one is running share its result or exception
+    instead of running again, so a burst of identical requests costs one set of
+    queries. Calls arriving while a key is being recomputed get its previous result
+    at once if that is at most ``stale_seconds`` old (default
+    STALE_WHILE_REVALIDATE_SECONDS; 0 always waits). Nothing is served from memory
+    when no call is in flight, so results are never staler than one computation.
+
+    The default key ignores arguments that aren't plain values (the session, the
+    request, the current user): only decorate handlers whose result depends on
+    their query and path parameters alone, and that return plain data rather than
+    ORM objects, since other requests serialize the same result.
+
+        @router.get("/store")
+        @single_flight()
+        def get_store_products(category: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    def decorate(func):
+        flight = SingleFlight(func, stale_seconds, key, maxsize)
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                return await flight.call_async(*args, **kwargs)
+            async_wrapper.single_flight = flight
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return flight.call(*args, **kwargs)
+        wrapper.single_flight = flight
+        return wrapper
+    return decorate
+
+def cached_response(request: Request, snapshot: Snapshot) -> Response:
+    """Serve a snapshot's pre-encoded body, compressed once per encoding, answering 304 when the client already has it"""
+    return precompressed_response(request, snapshot.body, snapshot.etag, snapshot.variants)
@@ -0,0 +1,187 @@
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session, aliased
+
+from database.database import upsert
+from models.category import Category, CategoryStats
+from models.product import Product
+
+def _ancestor_ids(db: Session, category_ids: Iterable[int]):
+    """Every category on the path of the given ones, read straight from their materialized paths"""
+    ids = set()
+    paths = db.query(Category.path).filter(Category.id.in_(set(category_ids))).all()
+    for (path,) in paths:
+        if path:
+            ids.update(int(part) for part in path.strip("/").split("/"))
+    return ids
+
+def _rolled_up_stats(db: Session):
+    """Aggregates for every category from one grouped pass over products.
+
+    Each category's own totals are added to every category on its path. The
+    ancestor/member LIKE join does the same per category, but over a whole
+    catalog it revisits every product once per ancestor.
+    """
+    available = Product.availability == True
+    own = db.query(
+        Product.category_id,
+        func.count(Product.id),
+        func.sum(case((available, 1), else_=0)),
+        func.sum(case((available & (Product.discounted_price > 0), 1), else_=0)),
+        func.min(case((available, Product.price))),
+        func.max(case((available, Product.price))),
+    ).filter(Product.category_id.isnot(None)).group_by(Product.category_id).all()
+    paths = dict(db.query(Category.id, Category.path).all())
+    
+    totals = {}
+    for category_id, total, available_count, discounted_count, min_price, max_price in own:
+        path = paths.get(category_id)
+        if not path:
+            continue
+        for ancestor_id in (int(part) for part in path.strip("/").split("/")):
+            entry = totals.setdefault(ancestor_id, [ancestor_id, 0, 0, 0, None, None])
+            entry[1] += total
+            entry[2] += available_count or 0
+            entry[3] += discounted_count or 0
+            if min_price is not None and (entry[4] is None or min_price < entry[4]):
+                entry[4] = min_price
+            if max_price is not None and (entry[5] is None or max_price > entry[5]):
+                entry[5] = max_price
+    return list(totals.values())
+
+def _subtree_aggregates(db: Session, category_ids: Iterable[int], *columns):
+    """Grouped aggregates over the products in each given category's subtree"""
+    ancestor = aliased(Category)
+    member = aliased(Category)
+    return db.query(ancestor.id, *columns).select_from(ancestor)\
+        .join(member, member.path.like(ancestor.path + "%"))\
+        .join(Product, Product.category_id == member.id)\
+        .filter(ancestor.id.in_(set(category_ids)))\
+        .group_by(ancestor.id)\
+        .all()
+
+def refresh_category_stats(db: Session, category_ids: Optional[Iterable[int]] = None):
+    """Recompute subtree aggregates in one grouped query.
+
+    With ``category_ids`` only those categories and their ancestors are refreshed,
+    e.g. for a new category (product writes use apply_product_stats_change).
+    Without it every category is recomputed, rolling per-category totals up the paths.
+    Runs inside the caller's transaction; the caller commits.
+    """
+    if category_ids is None:
+        targets = {category_id for (category_id,) in db.query(Category.id).all()}
+    else:
+        targets = _ancestor_ids(db, [category_id for category_id in category_ids if category_id is not None])
+    if not targets:
+        return
+    
+    if category_ids is None:
+        rows = _rolled_up_stats(db)
+    else:
+        available = Product.availability == True
+        rows = _subtree_aggregates(
+            db, targets,
+            func.count(Product.id),
+            func.sum(case((available, 1), else_=0)),
+            func.sum(case((available & (Product.discounted_price > 0), 1), else_=0)),
+            func.min(case((available, Product.price))),
+            func.max(case((available, Product.price))),
+        )
+    
+    aggregates = {row[0]: row for row in rows}
+    # Categories without products get an explicit zero row so readers never need a fallback query
+    mappings = []
+    # Sorted, so concurrent refreshes lock shared ancestors' rows in the same order
+    for category_id in sorted(targets):
+        _, total, available_count, discounted_count, min_price, max_price = aggregates.get(
+            category_id, (category_id, 0, 0, 0, None, None)
+        )
+        mappings.append({
+            "category_id": category_id,
+            "product_count": total,
+            "available_count": available_count or 0,
+            "discounted_count": discounted_count or 0,
+            "min_price": min_price,
+            "max_price": max_price,
+        })
+    
+    # An upsert, so two product writes under the same ancestors don't both insert its row
+    upsert(db, CategoryStats, mappings, key=["category_id"])
+
+# What one product contributes to its categories' stats: (category_id, available, discounted, price)
+ProductStatsState = Tuple[int, bool, bool, float]
+
+def product_stats_state(product) -> Optional[ProductStatsState]:
+    """A product's contribution to category stats, or None when it counts towards none"""
+    if product is None or product.category_id is None:
+        return None
+    available = bool(product.availability)
+    return (product.category_id, available, available and (product.discounted_price or 0) > 0, product.price)
+
+def apply_product_stats_change(db: Session, old: Optional[ProductStatsState], new: Optional[ProductStatsState]):
+    """Move category stats from a product's old state to its new one without re-aggregating subtrees.
+
+    ``old`` is None for a new product, ``new`` None for a deleted one. Counts move
+    by the difference on every ancestor, and a new available price widens the
+    range in place. Only when the old price was a category's minimum or maximum
+    is that range recomputed from its subtree. Call after flushing the product
+    write, inside the caller's transaction; the caller commits.
+    """
+    if old == new:
+        return
+    old_ancestors = _ancestor_ids(db, [old[0]]) if old else set()
+    new_ancestors = _ancestor_ids(db, [new[0]]) if new else set()
+    deltas = {}
+    for state, ancestors, sign in ((old, old_ancestors, -1), (new, new_ancestors, 1)):
+        if state is None:
+            continue
+        _, available, discounted, price = state
+        for ancestor_id in ancestors:
+            entry = deltas.setdefault(ancestor_id, {"category_id": ancestor_id, "product_count": 0, "available_count": 0,
+                                                    "discounted_count": 0, "min_price": None, "max_price": None})
+            entry["product_count"] += sign
+            entry["available_count"] += sign * available
+            entry["discounted_count"] += sign * discounted
+            if sign > 0 and available:
+                entry["min_price"] = entry["max_price"] = price
+    if not deltas:
+        return
+
+    # Sorted, so concurrent writes lock shared ancestors' rows in the same order
+    upsert(db, CategoryStats, [deltas[category_id] for category_id in sorted(deltas)], key=["category_id"],
+           update=lambda columns, excluded: {
+               "product_count": columns.product_count + excluded.product_count,
+               "available_count": columns.available_count + excluded.available_count,
+               "discounted_count": columns.discounted_count + excluded.discounted_count,
+               "min_price": case((excluded.min_price < columns.min_price, excluded.min_price),
+                                 else_=func.coalesce(columns.min_price, excluded.min_price)),
+               "max_price": case((excluded.max_price > columns.max_price, excluded.max_price),
+                                 else_=func.coalesce(columns.max_price, excluded.max_price)),
+           })
+
+    if old is None or not old[1]:
+        return
+    # The rows are locked by the upsert now, so what they hold is this write's result;
+    # a category whose range still ends at the old price may have lost its only product there
+    old_price = old[3]
+    candidates = old_ancestors
+    if new is not None and new[1] and new[3] == old_price:
+        candidates = candidates - new_ancestors  # Still has a product at that price
+    if not candidates:
+        return
+    boundary = [category_id for (category_id,) in db.query(CategoryStats.category_id).filter(
+        CategoryStats.category_id.in_(candidates),
+        (CategoryStats.min_price == old_price) | (CategoryStats.max_price == old_price),
+    )]
+    if not boundary:
+        return
+    available = Product.availability == True
+    ranges = {category_id: (min_price, max_price) for category_id, min_price, max_price in _subtree_aggregates(
+        db, boundary, func.min(case((available, Product.price))), func.max(case((available, Product.price))),
+    )}
+    db.bulk_update_mappings(CategoryStats, [
+        {"category_id": category_id, "min_price": ranges.get(category_id, (None, None))[0],
+         "max_price": ranges.get(category_id, (None, None))[1]}
+        for category_id in sorted(boundary)
+    ])
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from core.cache import bump_version
+from core.config import settings
+from database.database import SessionLocal
+from models.product import Product, ProductChange
+
+logger = logging.getLogger("freshly.changes")
+
+SEQUENCE_BATCH = 1000
+
+def log_product_changes(db: Session, product_ids: Iterable[int], deleted: bool = False):
+    """Append products to the change feed; call inside the writing transaction, right before commit"""
+    db.bulk_insert_mappings(ProductChange, [
+        {"product_id": product_id, "deleted": deleted, "changed_at": datetime.now(timezone.utc)}
+        for product_id in dict.fromkeys(product_ids)
+    ])
+
+def assign_change_sequence(db: Session):
+    """Number committed feed entries that have no seq yet, after every numbered one; commits.
+
+    An id handed out at insert only becomes visible at commit, so a slow transaction
+    could commit a lower id after a reader had moved past it. Numbering happens
+    instead once the entries are committed, by one transaction at a time (they queue
+    on the "product_changes" version row), so a new seq is always above any a
+    reader can have seen. Only the sequencer task calls this; readers never write.
+    """
+    if db.query(ProductChange.id).filter(ProductChange.seq.is_(None)).first() is None:
+        return
+    # End the read above first: SQLite can't upgrade a read transaction to a write while another writer waits
+    db.commit()
+    bump_version(db, "product_changes")
+    last = db.query(func.max(ProductChange.seq)).scalar() or 0
+    while True:
+        ids = [change_id for (change_id,) in db.query(ProductChange.id)
+               .filter(ProductChange.seq.is_(None))
+               .order_by(ProductChange.id)
+               .limit(SEQUENCE_BATCH)]
+        db.bulk_update_mappings(ProductChange, [
+            {"id": change_id, "seq": last + offset} for offset, change_id in enumerate(ids, 1)
+        ])
+        last += len(ids)
+        if len(ids) < SEQUENCE_BATCH:
+            break
+    db.commit()
+
+def _sequence_pending_changes():
+    db = SessionLocal()
+    try:
+        assign_change_sequence(db)
+    finally:
+        db.close()
+
+async def run_change_sequencer():
+    """Number newly committed entries every CHANGE_FEED_SEQUENCE_SECONDS, for as long as the worker runs.
+
+    An idle pass is one read; workers only contend for the version row while there
+    is something to number.
+    """
+    while True:
+        try:
+            await run_in_threadpool(_sequence_pending_changes)
+        except Exception:
+            logger.exception("Numbering change feed entries failed")
+        await asyncio.sleep(settings.CHANGE_FEED_SEQUENCE_SECONDS)
+
+_sequencer: Optional[asyncio.Task] = None
+
+def start_change_sequencer():
+    """Start this worker's sequencer task; call once from startup"""
+    global _sequencer
+    if _sequencer is None or _sequencer.done():
+        _sequencer = asyncio.get_running_loop().create_task(run_change_sequencer())
+
+def read_product_changes(db: Session, since: int, limit: int):
+    """Changes after cursor ``since``, oldest first, each product once at its current state.
+
+    Returns (changes, next_cursor, has_more). Read-only: entries show up once the
+    sequencer has numbered them, within CHANGE_FEED_SEQUENCE_SECONDS of their commit.
+    """
+    rows = db.query(ProductChange.seq, ProductChange.product_id)\
+        .filter(ProductChange.seq > since)\
+        .order_by(ProductChange.seq)\
+        .limit(limit + 1)\
+        .all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if not rows:
+        return [], since, False
+
+    # Later entries for the same product supersede earlier ones within a page
+    latest = {product_id: seq for seq, product_id in rows}
+    products = {p.id: p for p in db.query(Product).filter(Product.id.in_(list(latest))).all()}
+    changes: List[dict] = []
+    for product_id, seq in sorted(latest.items(), key=lambda item: item[1]):
+        product = products.get(product_id)
+        changes.append({"seq": seq, "id": product_id, "deleted": product is None, "product": product})
+    return changes, rows[-1][0], has_more
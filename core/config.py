@@ -18,6 +18,53 @@ class Settings(BaseSettings):
     APP_DESCRIPTION: str = "Your go-to grocery backend!"
     DOMAIN: str = "localhost"
     
+    # Password hashing
+    BCRYPT_ROUNDS: int = 12  # Existing hashes with a different cost are rehashed on login
+    PASSWORD_HASH_WORKERS: int = 2  # Threads dedicated to bcrypt, separate from the request threadpool
+    PASSWORD_HASH_MAX_PENDING: int = 16  # Hash/verify jobs allowed in flight or queued before answering 503
+    
+    # Auth
+    TOKEN_CACHE_SIZE: int = 4096  # Verified bearer tokens kept in memory; 0 disables the cache
+    
+    # Caching
+    CACHE_VERSION_CHECK_SECONDS: float = 2.0  # How often a worker re-reads cache_versions to pick up other workers' writes
+    STALE_WHILE_REVALIDATE_SECONDS: float = 5.0  # Oldest result a @single_flight handler hands out while recomputing it; 0 waits instead
+    
+    # Response compression
+    COMPRESSION_MIN_SIZE: int = 1024  # Smaller bodies are sent as they are; compressing them saves too little
+    GZIP_LEVEL: int = 6  # 1 (fastest) to 9 (smallest)
+    BROTLI_QUALITY: int = 5  # 0 to 11; br is only offered when the brotli package is installed
+    
+    # SQL instrumentation
+    SERVER_TIMING_ENABLED: bool = False  # Report per-request query count and DB time in a Server-Timing header
+    SLOW_QUERY_MS: float = 200.0  # Log statements slower than this; 0 disables the slow-query log
+    N_PLUS_ONE_THRESHOLD: int = 10  # Log a statement run this many times in one request; 0 disables
+    
+    # Tracing
+    TRACE_SAMPLE_RATE: float = 0.0  # Share of requests traced, 0 to 1; above 0 a sampled incoming traceparent is followed too
+    TRACE_FOLLOW_PARENT: bool = False  # Follow a sampled incoming traceparent even at rate 0; only behind a proxy that strips untrusted ones
+    TRACE_EXPORT_PATH: str = "traces.jsonl"  # Built-in exporter's output file
+    TRACE_EXPORT_MAX_BYTES: int = 100_000_000  # Rotate the file to <path>.1 past this size, replacing the previous one; 0 never rotates
+    TRACE_EXPORT_FORMAT: str = "otlp"  # "otlp": one OTLP/JSON request per trace, "flat": one line per span
+    
+    # Per-request profiling (admins send X-Profile: collapsed|speedscope)
+    PROFILING_ENABLED: bool = True  # False leaves the profiler middleware out entirely
+    PROFILE_SAMPLE_INTERVAL_MS: float = 2.0  # Time between stack samples
+    PROFILE_DIR: str = "profiles"  # Where profiles are written
+    
+    # Change feed (GET /products/changes)
+    CHANGE_FEED_SEQUENCE_SECONDS: float = 0.5  # How often each worker numbers newly committed entries, i.e. how late they show up in the feed
+    
+    # Live product updates (GET /products/stream)
+    STREAM_MAX_IDS: int = 100  # Products one connection may follow
+    STREAM_QUEUE_SIZE: int = 256  # Undelivered events per connection before it is told to reload
+    STREAM_HEARTBEAT_SECONDS: float = 15.0  # Keep-alive comment interval, also when disconnects are noticed
+    STREAM_POLL_SECONDS: float = 1.0  # How often the change feed is read for other workers' writes while anyone is subscribed
+    
+    # Popularity
+    POPULARITY_HALF_LIFE_DAYS: float = 14.0  # A sale counts half as much toward popularity after this long
+    POPULAR_PRODUCTS_CACHE_SECONDS: float = 60.0  # New sales reach the cached popular list within this long
+    
     # Testing
     TESTING: bool = False
 
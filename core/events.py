@@ -0,0 +1,144 @@
+import asyncio
+import threading
+from typing import Dict, Iterable, List, Optional, Set
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from core.changes import read_product_changes
+from core.config import settings
+from database.database import SessionLocal
+from models.product import Product, ProductChange
+
+def product_state(product: Product) -> dict:
+    """The fields live product pages follow"""
+    return {
+        "id": product.id,
+        "price": product.price,
+        "discounted_price": product.discounted_price,
+        "stock_quantity": product.stock_quantity,
+        "availability": product.availability,
+    }
+
+def deleted_state(product_id: int) -> dict:
+    return {"id": product_id, "deleted": True}
+
+class Subscription:
+    """One SSE connection: the products it follows and a bounded queue of pending events"""
+
+    def __init__(self, product_ids: Iterable[int], queue_size: int):
+        self.product_ids = set(product_ids)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.last_sent: Dict[int, dict] = {}
+        self.overflowed = False
+
+    def offer(self, state: dict):
+        # The same change can arrive from a local write and from the change feed; send it once
+        if self.last_sent.get(state["id"]) == state:
+            return
+        try:
+            self.queue.put_nowait(state)
+            self.last_sent[state["id"]] = state
+        except asyncio.QueueFull:
+            # A client that stopped reading gets told to reload instead of growing memory
+            self.overflowed = True
+
+class ProductEventHub:
+    """Fans product stock and price updates out to SSE subscribers on this worker.
+
+    Writes on this worker are published directly. Writes on other workers reach
+    it through the product change feed, polled every STREAM_POLL_SECONDS, but only
+    while someone is subscribed, so an idle hub costs nothing. Polls only read;
+    the change sequencer numbers entries. Subscribers are
+    indexed by product, so a publish only touches the connections that follow it.
+    """
+
+    def __init__(self):
+        self._by_product: Dict[int, Set[Subscription]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._poller: Optional[asyncio.Task] = None
+        self._cursor = 0
+        self._lock = threading.Lock()
+
+    def subscribe(self, product_ids: Iterable[int]) -> Subscription:
+        subscription = Subscription(product_ids, settings.STREAM_QUEUE_SIZE)
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            for product_id in subscription.product_ids:
+                self._by_product.setdefault(product_id, set()).add(subscription)
+        if self._poller is None or self._poller.done():
+            self._poller = self._loop.create_task(self._poll_changes())
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            for product_id in subscription.product_ids:
+                subscribers = self._by_product.get(product_id)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._by_product[product_id]
+
+    def watching(self, product_ids: Iterable[int]) -> List[int]:
+        """Which of these products have subscribers"""
+        return [product_id for product_id in product_ids if product_id in self._by_product]
+
+    def publish(self, states: List[dict]):
+        """Queue updates for subscribers; safe to call from request threads"""
+        loop = self._loop
+        if not states or loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(self._dispatch, states)
+
+    def _dispatch(self, states: List[dict]):
+        for state in states:
+            for subscription in list(self._by_product.get(state["id"], ())):
+                subscription.offer(state)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len({subscription for subscribers in self._by_product.values() for subscription in subscribers})
+
+    async def _poll_changes(self):
+        self._cursor = await run_in_threadpool(self._latest_seq)
+        while self._by_product:
+            await asyncio.sleep(settings.STREAM_POLL_SECONDS)
+            self._cursor, states = await run_in_threadpool(self._read_changes, self._cursor)
+            self._dispatch(states)
+
+    @staticmethod
+    def _latest_seq() -> int:
+        db = SessionLocal()
+        try:
+            return db.query(func.max(ProductChange.seq)).scalar() or 0
+        finally:
+            db.close()
+
+    def _read_changes(self, cursor: int):
+        db = SessionLocal()
+        try:
+            states = []
+            has_more = True
+            while has_more:
+                changes, cursor, has_more = read_product_changes(db, cursor, 1000)
+                for change in changes:
+                    if change["id"] in self._by_product:
+                        product = change["product"]
+                        states.append(product_state(product) if product else deleted_state(change["id"]))
+            return cursor, states
+        finally:
+            db.close()
+
+product_events = ProductEventHub()
+
+def publish_product_changes(db: Session, product_ids: Iterable[int]):
+    """After a commit, push the current state of any watched products to their subscribers"""
+    watched = product_events.watching(product_ids)
+    if not watched:
+        return
+    found = {p.id: p for p in db.query(Product).filter(Product.id.in_(watched)).all()}
+    product_events.publish([
+        product_state(found[product_id]) if product_id in found else deleted_state(product_id)
+        for product_id in watched
+    ])
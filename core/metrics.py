@@ -0,0 +1,156 @@
+import time
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+
+# Upper bounds in seconds; the last bucket (+Inf) is implicit
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class RequestMetrics:
+    """Request counts and latency histograms per (method, route template).
+
+    Updated only from the event loop thread by MetricsMiddleware, so plain list
+    increments are safe without a lock. Metrics are per process; with several
+    workers each one reports its own share.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.histograms: Dict[Tuple[str, str], list] = {}  # bucket counts, then sum and count
+        self.statuses: Dict[Tuple[str, str, int], int] = {}
+        self.in_flight = 0
+
+    def observe(self, method: str, route: str, status: int, seconds: float):
+        key = (method, route)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        histogram[bisect_left(self.buckets, seconds)] += 1
+        histogram[-2] += seconds
+        histogram[-1] += 1
+        status_key = (method, route, status)
+        self.statuses[status_key] = self.statuses.get(status_key, 0) + 1
+
+    def render(self) -> List[str]:
+        lines = [
+            "# HELP http_request_duration_seconds Request latency by route template",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route), histogram in sorted(self.histograms.items()):
+            labels = f'method="{method}",route="{_escape(route)}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), histogram):
+                cumulative += count
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {histogram[-2]}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {histogram[-1]}")
+        lines += ["# HELP http_requests_total Responses by route template and status", "# TYPE http_requests_total counter"]
+        for (method, route, status), count in sorted(self.statuses.items()):
+            lines.append(f'http_requests_total{{method="{method}",route="{_escape(route)}",status="{status}"}} {count}')
+        lines += ["# HELP http_requests_in_flight Requests being handled", "# TYPE http_requests_in_flight gauge",
+                  f"http_requests_in_flight {self.in_flight}"]
+        return lines
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+request_metrics = RequestMetrics()
+
+class MetricsMiddleware:
+    """Pure ASGI middleware timing every HTTP request into request_metrics.
+
+    Requests are keyed by the matched route's path template, which the router
+    leaves in ``scope["route"]``, so /products/{product_id_or_slug} is one series
+    however many products are viewed. Unmatched paths share one "unmatched" series.
+    """
+
+    def __init__(self, app, metrics: RequestMetrics = request_metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        metrics = self.metrics
+        metrics.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.in_flight -= 1
+            route = scope.get("route")
+            metrics.observe(scope["method"], getattr(route, "path", "unmatched"), status, time.perf_counter() - start)
+
+def _pool_samples():
+    from database.database import engine
+    pool = engine.pool
+    samples = []
+    for name, help_text, method in (
+        ("db_pool_size", "Connections the pool keeps open", "size"),
+        ("db_pool_checked_out", "Connections in use by requests", "checkedout"),
+        ("db_pool_checked_in", "Idle connections in the pool", "checkedin"),
+    ):
+        if hasattr(pool, method):  # SQLite's single-thread pools don't track these
+            samples.append((name, help_text, {}, getattr(pool, method)()))
+    return samples
+
+def _cache_samples():
+    from core.cache import CACHE_REGISTRY, SINGLE_FLIGHT_REGISTRY
+    from core.security import token_cache
+    totals: Dict[str, List[int]] = {}
+    stale: Dict[str, int] = {}
+    for cache in CACHE_REGISTRY:
+        # Caches sharing a version name (the store settings views) report together
+        counts = totals.setdefault(cache.name, [0, 0])
+        counts[0] += cache.hits
+        counts[1] += cache.misses
+        stale[cache.name] = stale.get(cache.name, 0) + cache.stale_hits
+    totals["auth_tokens"] = [token_cache.hits, token_cache.misses]
+    flights = []
+    for flight in SINGLE_FLIGHT_REGISTRY:
+        for outcome, count in (("computed", flight.computed), ("shared", flight.shared), ("stale", flight.stale)):
+            flights.append(("single_flight_calls_total", "Calls of @single_flight handlers by how they were answered",
+                            {"function": flight.name, "outcome": outcome}, count))
+    return ([("cache_hits_total", "Reads served from memory", {"cache": name}, hits) for name, (hits, _) in sorted(totals.items())]
+            + [("cache_misses_total", "Reads that rebuilt the cache", {"cache": name}, misses) for name, (_, misses) in sorted(totals.items())]
+            + [("cache_stale_hits_total", "Reads given the previous snapshot while another thread rebuilt", {"cache": name}, count)
+               for name, count in sorted(stale.items())]
+            + flights)
+
+def _component_samples():
+    from core.events import product_events
+    from core.search import suggest_index
+    from core.security import password_pool
+    pool = password_pool.stats()
+    index = suggest_index.stats()
+    return [
+        ("password_hash_in_flight", "Password hash/verify jobs running", {}, pool["in_flight"]),
+        ("password_hash_queue_depth", "Password hash/verify jobs waiting for a worker", {}, pool["queue_depth"]),
+        ("password_hash_completed_total", "Password hash/verify jobs finished", {}, pool["completed"]),
+        ("password_hash_rejected_total", "Password hash/verify jobs refused with 503", {}, pool["rejected"]),
+        ("search_index_entries", "Products and categories in the suggestion index", {}, index["entries"]),
+        ("search_index_memory_bytes", "Approximate suggestion index size", {}, index["memory_bytes"]),
+        ("product_stream_subscribers", "Open /products/stream connections", {}, product_events.subscriber_count()),
+    ]
+
+def render_metrics() -> str:
+    """Prometheus text exposition of request metrics plus pool, cache and component gauges"""
+    lines = request_metrics.render()
+    described = set()
+    for samples in (_pool_samples, _cache_samples, _component_samples):
+        for name, help_text, labels, value in samples():
+            if name not in described:
+                described.add(name)
+                kind = "counter" if name.endswith("_total") else "gauge"
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            label_text = ",".join(f'{key}="{_escape(str(val))}"' for key, val in labels.items())
+            lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+    return "\n".join(lines) + "\n"
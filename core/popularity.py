@@ -0,0 +1,64 @@
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from database.database import upsert
+from models.order import Order, OrderItem, OrderStatus
+from models.product import ProductPopularity
+
+# Forward decay: a sale at time t adds quantity * 2 ** ((t - LANDMARK) / half-life).
+# Newer sales weigh more instead of older scores shrinking, so stored scores never need
+# rewriting as time passes, yet ordering by score is ordering by exponentially decayed
+# units sold. Weights double every half-life; a float has headroom for decades of that.
+POPULARITY_LANDMARK = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+def sale_weight(when: Optional[datetime] = None) -> float:
+    when = when or datetime.now(timezone.utc)
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)  # SQLite hands timestamps back naive, in UTC
+    half_lives = (when - POPULARITY_LANDMARK).total_seconds() / (settings.POPULARITY_HALF_LIFE_DAYS * 86400)
+    return 2.0 ** half_lives
+
+def record_sales(db: Session, quantities: Dict[int, int], when: Optional[datetime] = None):
+    """Add (or with negative quantities, take back) sales; call inside the order's transaction.
+
+    One upsert, so concurrent first sales of a product don't collide. No cache version
+    is bumped: the popular list is rebuilt on a timer (POPULAR_PRODUCTS_CACHE_SECONDS)
+    rather than making every checkout queue on one shared row.
+    """
+    weight = sale_weight(when)
+    # Sorted, so concurrent orders lock shared products' rows in the same order
+    rows = [
+        {"product_id": product_id, "score": quantities[product_id] * weight, "units_sold": quantities[product_id]}
+        for product_id in sorted(quantities)
+    ]
+    if rows:
+        upsert(db, ProductPopularity, rows, key=["product_id"], update=lambda columns, excluded: {
+            "score": columns.score + excluded.score,
+            "units_sold": columns.units_sold + excluded.units_sold,
+        })
+
+def order_quantities(order: Order) -> Dict[int, int]:
+    quantities: Dict[int, int] = {}
+    for item in order.items:
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+    return quantities
+
+def rebuild_popularity(db: Session):
+    """Recompute every score from order history, e.g. after a bulk import; the caller commits"""
+    scores: Dict[int, list] = {}
+    rows = db.query(OrderItem.product_id, OrderItem.quantity, Order.created_at)\
+        .join(Order, Order.id == OrderItem.order_id)\
+        .filter(Order.status != OrderStatus.CANCELLED.value)\
+        .yield_per(10000)
+    for product_id, quantity, created_at in rows:
+        entry = scores.setdefault(product_id, [0.0, 0])
+        entry[0] += quantity * sale_weight(created_at)
+        entry[1] += quantity
+    db.query(ProductPopularity).delete(synchronize_session=False)
+    db.bulk_insert_mappings(ProductPopularity, [
+        {"product_id": product_id, "score": score, "units_sold": units}
+        for product_id, (score, units) in scores.items()
+    ])
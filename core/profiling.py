@@ -0,0 +1,170 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+
+from core.config import settings
+from core.security import get_current_admin_user, user_from_token
+from database.database import SessionLocal
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_FORMATS = ("collapsed", "speedscope")
+
+# Stacks whose innermost frame sits in one of these are threads waiting for work, not doing it
+_IDLE_FILES = ("selectors.py", "threading.py", "queue.py", os.path.join("concurrent", "futures", "thread.py"))
+
+Frame = Tuple[str, str, int]  # function, file, first line
+
+class SamplingProfiler:
+    """Statistical profiler: a thread that snapshots every other thread's stack at a fixed interval.
+
+    Costs nothing until started. It samples the whole process, since one request
+    hops between the event loop and threadpool threads; waiting threads are left
+    out, but on a busy worker other requests' work shows up too.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples: Counter = Counter()  # (thread name, frames root first) -> count
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.started_at = 0.0
+        self.elapsed = 0.0
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started_at
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                    frame = frame.f_back
+                if stack and not stack[0][1].endswith(_IDLE_FILES):
+                    self.samples[(names.get(ident, str(ident)), tuple(reversed(stack)))] += 1
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's folded format, for flamegraph.pl, speedscope or inferno"""
+        lines = []
+        for (thread, stack), count in self.samples.most_common():
+            frames = ";".join(f"{name} ({os.path.basename(path)}:{line})" for name, path, line in stack)
+            lines.append(f"{thread};{frames} {count}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self, name: str) -> dict:
+        """speedscope's sampled-profile JSON, one profile per thread"""
+        frames, index = [], {}
+        by_thread = {}
+        for (thread, stack), count in self.samples.items():
+            ids = []
+            for frame in stack:
+                if frame not in index:
+                    index[frame] = len(frames)
+                    frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                ids.append(index[frame])
+            profile = by_thread.setdefault(thread, {"samples": [], "weights": []})
+            profile["samples"].append(ids)
+            profile["weights"].append(count * self.interval * 1000)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": settings.APP_NAME,
+            "shared": {"frames": frames},
+            "profiles": [
+                {"type": "sampled", "name": thread, "unit": "milliseconds", "startValue": 0,
+                 "endValue": sum(profile["weights"]), **profile}
+                for thread, profile in by_thread.items()
+            ],
+        }
+
+def _token_user(token: str):
+    db = SessionLocal()
+    try:
+        return user_from_token(token, db)
+    finally:
+        db.close()
+
+async def _require_admin(scope):
+    """Run the same checks as the get_current_admin_user dependency against the request's bearer token"""
+    authorization = dict(scope["headers"]).get(b"authorization", b"").decode("latin-1")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=401, detail="Profiling requires an admin bearer token")
+    # The user lookup is a sync query, so it runs in the threadpool like the handlers' own
+    await get_current_admin_user(await run_in_threadpool(_token_user, token))
+
+class ProfilerMiddleware:
+    """Profiles single requests that carry ``X-Profile: collapsed`` or ``X-Profile: speedscope``.
+
+    Only admins may ask. The profile is written to PROFILE_DIR and its file name
+    returned in an ``X-Profile-File`` response header. Requests without the header
+    only pay for the header lookup.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        requested = next((value for key, value in scope["headers"] if key == PROFILE_HEADER), None)
+        if requested is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile_format = requested.decode("latin-1").strip().lower() or "collapsed"
+        try:
+            if profile_format not in PROFILE_FORMATS:
+                raise HTTPException(status_code=400, detail=f"X-Profile must be one of {', '.join(PROFILE_FORMATS)}")
+            await _require_admin(scope)
+        except HTTPException as exc:
+            await JSONResponse({"detail": exc.detail}, status_code=exc.status_code, headers=exc.headers)(scope, receive, send)
+            return
+
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        slug = scope["path"].strip("/").replace("/", "_") or "root"
+        extension = "collapsed.txt" if profile_format == "collapsed" else "speedscope.json"
+        filename = f"{stamp}-{scope['method']}-{slug}.{extension}"[:200]
+
+        async def send_with_file(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", [])) + [(b"x-profile-file", filename.encode())]}
+            await send(message)
+
+        profiler = SamplingProfiler(settings.PROFILE_SAMPLE_INTERVAL_MS / 1000)
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_file)
+        finally:
+            profiler.stop()
+            await run_in_threadpool(_write_profile, profiler, profile_format, filename, f"{scope['method']} {scope['path']}")
+
+def _write_profile(profiler: SamplingProfiler, profile_format: str, filename: str, name: str):
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    with open(os.path.join(settings.PROFILE_DIR, filename), "w") as f:
+        if profile_format == "collapsed":
+            f.write(profiler.collapsed())
+        else:
+            json.dump(profiler.speedscope(name), f)
@@ -0,0 +1,131 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from core.config import settings
+
+logger = logging.getLogger("freshly.sql")
+
+class QueryStats:
+    """SQL issued while handling one request"""
+    __slots__ = ("count", "seconds", "slowest_seconds", "slowest_statement", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement: Optional[str] = None
+        self.statements: Dict[str, int] = {}  # Parameterized SQL -> times executed
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        if seconds > self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = statement
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+
+    def repeated(self, threshold: int):
+        """Statements run at least threshold times, the usual shape of an N+1 lazy load"""
+        return [(statement, count) for statement, count in self.statements.items() if count >= threshold]
+
+# Set per request by QueryStatsMiddleware; copied into the threadpool that runs sync handlers
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+# Called with (route, stats) after every request; used by assert_query_budget
+_observers: List[Callable[[str, QueryStats], None]] = []
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - conn.info["query_started"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, seconds)
+    if settings.SLOW_QUERY_MS and seconds * 1000 >= settings.SLOW_QUERY_MS:
+        logger.warning("Slow query (%.1f ms): %s", seconds * 1000, _shorten(statement))
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute; drop its start time so the next one is timed right
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+        started.pop()
+
+def _shorten(statement: str, length: int = 500) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= length else statement[:length] + "..."
+
+class QueryStatsMiddleware:
+    """Pure ASGI middleware collecting per-request SQL statistics.
+
+    With SERVER_TIMING_ENABLED the totals go back in a Server-Timing header
+    (browser dev tools show it next to the request). Statements repeated
+    N_PLUS_ONE_THRESHOLD times or more in one request are logged as likely N+1s.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and settings.SERVER_TIMING_ENABLED:
+                # Queries of a streamed body run after this point and are not included
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(stats, time.perf_counter() - start).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            route = getattr(scope.get("route"), "path", scope["path"])
+            if settings.N_PLUS_ONE_THRESHOLD:
+                for statement, count in stats.repeated(settings.N_PLUS_ONE_THRESHOLD):
+                    logger.warning("Possible N+1 in %s %s: %d x %s", scope["method"], route, count, _shorten(statement, 200))
+            for observer in _observers:
+                observer(route, stats)
+
+def server_timing(stats: QueryStats, total_seconds: float) -> str:
+    return (f'db;dur={stats.seconds * 1000:.1f};desc="{stats.count} queries", '
+            f'db-slowest;dur={stats.slowest_seconds * 1000:.1f}, '
+            f'app;dur={total_seconds * 1000:.1f}')
+
+@contextmanager
+def assert_query_budget(max_queries: int):
+    """Fail when any request made inside the block runs more than max_queries SQL statements.
+
+        with assert_query_budget(5):
+            client.get("/products/store")
+
+    Yields the list of (route, QueryStats) seen, for finer assertions.
+    """
+    seen = []
+    observer = lambda route, stats: seen.append((route, stats))
+    _observers.append(observer)
+    try:
+        yield seen
+    finally:
+        _observers.remove(observer)
+    for route, stats in seen:
+        if stats.count > max_queries:
+            worst = sorted(stats.statements.items(), key=lambda item: -item[1])[:3]
+            details = "; ".join(f"{count} x {_shorten(statement, 120)}" for statement, count in worst)
+            raise AssertionError(f"{route} ran {stats.count} queries, budget is {max_queries}: {details}")
@@ -0,0 +1,479 @@
+import heapq
+import sys
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from core.cache import current_version
+from core.config import settings
+from database.database import SessionLocal
+from models.category import Category, CategoryStats
+from models.product import Product, ProductPopularity
+
+def normalize(text: str) -> str:
+    """Lower-case, accent-free, single-spaced form used for all index terms and queries"""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(text.casefold().split())
+
+def _word_offsets(normalized: str) -> List[int]:
+    """Start of every word, so "app" finds both "Apple Juice" and "Green Apple"."""
+    return [i for i, char in enumerate(normalized) if char != " " and (i == 0 or normalized[i - 1] == " ")]
+
+def _trigrams(word: str):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _edit_distance(a: str, b: str, bound: int) -> int:
+    """Levenshtein distance, giving up with bound + 1 as soon as it must exceed bound"""
+    if abs(len(a) - len(b)) > bound:
+        return bound + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > bound:
+            return bound + 1
+        previous = current
+    return previous[-1]
+
+class Vocabulary:
+    """Distinct words of the catalog with a trigram index, for correcting typos.
+
+    Matching runs against words rather than products, so query cost follows the
+    vocabulary size (thousands) instead of the catalog size. Tokens containing
+    digits (pack sizes, SKUs) are left out; they only ever match exactly.
+    """
+
+    def __init__(self):
+        self._counts: Dict[str, int] = {}
+        self._grams: Dict[str, set] = {}
+
+    @staticmethod
+    def _words(normalized: str):
+        return [word for word in normalized.split() if not any(char.isdigit() for char in word)]
+
+    def add(self, normalized: str):
+        for word in self._words(normalized):
+            count = self._counts.get(word, 0)
+            if not count:
+                for gram in _trigrams(word):
+                    self._grams.setdefault(gram, set()).add(word)
+            self._counts[word] = count + 1
+
+    def discard(self, normalized: str):
+        for word in self._words(normalized):
+            count = self._counts.get(word, 0) - 1
+            if count > 0:
+                self._counts[word] = count
+                continue
+            self._counts.pop(word, None)
+            for gram in _trigrams(word):
+                words = self._grams.get(gram)
+                if words is not None:
+                    words.discard(word)
+                    if not words:
+                        del self._grams[gram]
+
+    def corrections(self, word: str, limit: int = 3) -> List[Tuple[str, float]]:
+        """Known words within a small edit distance, best first, as (word, similarity)"""
+        if word in self._counts or any(char.isdigit() for char in word):
+            return [(word, 1.0)]
+        bound = 1 if len(word) <= 4 else 2
+        candidates = set()
+        for gram in _trigrams(word):
+            candidates.update(self._grams.get(gram, ()))
+        scored = []
+        for candidate in candidates:
+            distance = _edit_distance(word, candidate, bound)
+            if distance <= bound:
+                scored.append((candidate, 1 - distance / max(len(word), len(candidate))))
+        scored.sort(key=lambda match: (-match[1], -self._counts[match[0]]))
+        return scored[:limit]
+
+    def __len__(self):
+        return len(self._counts)
+
+class PrefixIndex:
+    """Autocomplete over product and category names.
+
+    Every word start of every name is one *position*, packed as ``slot << 8 | offset``
+    into an ``array`` kept sorted by the text from that offset on. A prefix is then a
+    contiguous range found with two bisects, and the most popular entries in it come
+    from ``heapq.nlargest`` over a parallel array of popularity, all in C loops. Only
+    the names themselves are stored as strings, so a term costs 16 bytes.
+
+    Ranges above ``MEMO_RANGE`` positions (one or two letter prefixes on a big
+    catalog) keep their top results memoized until a write touches that prefix.
+
+    Product names also feed a ``Vocabulary`` used by ``fuzzy`` for typo-tolerant search.
+    """
+
+    FUZZY_CANDIDATES = 500
+
+    MAX_LIMIT = 50
+    MEMO_RANGE = 50000
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+        self.version = -1
+
+    def _reset(self):
+        self._slots: Dict[Tuple[str, int], int] = {}
+        self._free: List[int] = []
+        self._kinds: List[Optional[str]] = []
+        self._ids: List[Optional[int]] = []
+        self._names: List[Optional[str]] = []
+        self._slugs: List[Optional[str]] = []
+        self._normalized: List[Optional[str]] = []
+        self._popularity: List[float] = []
+        self._positions = array("q")
+        self._ranks = array("d")
+        self._memo: Dict[str, List[int]] = {}
+        self._fuzzy_memo: Dict[str, List[int]] = {}
+        self._string_bytes = 0
+        self.vocabulary = Vocabulary()
+
+    def _term(self, position: int) -> str:
+        return self._normalized[position >> 8][position & 0xFF:]
+
+    def _store(self, slot, kind, entry_id, name, slug, popularity):
+        normalized = normalize(name)[:255]
+        values = (kind, entry_id, name, slug, normalized, popularity or 0.0)
+        if slot == len(self._kinds):
+            for column, value in zip(self._columns(), values):
+                column.append(value)
+        else:
+            for column, value in zip(self._columns(), values):
+                column[slot] = value
+        self._slots[(kind, entry_id)] = slot
+        self._string_bytes += sys.getsizeof(name) + sys.getsizeof(slug or "") + sys.getsizeof(normalized)
+        if kind == "product":
+            self.vocabulary.add(normalized)
+        return normalized
+
+    def _columns(self):
+        return (self._kinds, self._ids, self._names, self._slugs, self._normalized, self._popularity)
+
+    def load(self, entries):
+        """Replace the whole index from an iterable of (kind, id, name, slug, popularity)"""
+        fresh = PrefixIndex()
+        positions = []
+        for slot, (kind, entry_id, name, slug, popularity) in enumerate(entries):
+            normalized = fresh._store(slot, kind, entry_id, name, slug, popularity)
+            positions.extend(slot << 8 | offset for offset in _word_offsets(normalized))
+        positions.sort(key=fresh._term)
+        fresh._positions = array("q", positions)
+        fresh._ranks = array("d", (fresh._popularity[position >> 8] for position in positions))
+        with self._lock:
+            self.__dict__.update({key: value for key, value in fresh.__dict__.items() if key not in ("_lock", "version")})
+
+    def _find(self, position: int) -> int:
+        term = self._term(position)
+        index = bisect_left(self._positions, term, key=self._term)
+        while self._positions[index] != position:
+            index += 1
+        return index
+
+    def _unlink(self, slot: int):
+        normalized = self._normalized[slot]
+        for offset in _word_offsets(normalized):
+            index = self._find(slot << 8 | offset)
+            del self._positions[index]
+            del self._ranks[index]
+        self._forget_prefixes(normalized)
+
+    def _link(self, slot: int, normalized: str):
+        popularity = self._popularity[slot]
+        for offset in _word_offsets(normalized):
+            position = slot << 8 | offset
+            index = bisect_right(self._positions, normalized[offset:], key=self._term)
+            self._positions.insert(index, position)
+            self._ranks.insert(index, popularity)
+        self._forget_prefixes(normalized)
+
+    def _forget_prefixes(self, normalized: str):
+        if not self._memo and not self._fuzzy_memo:
+            return
+        for offset in _word_offsets(normalized):
+            term = normalized[offset:]
+            for length in range(1, len(term) + 1):
+                self._memo.pop(term[:length], None)
+                self._fuzzy_memo.pop(term[:length], None)
+
+    def _release_strings(self, slot: int):
+        if self._kinds[slot] == "product":
+            self.vocabulary.discard(self._normalized[slot])
+        self._string_bytes -= (sys.getsizeof(self._names[slot]) + sys.getsizeof(self._slugs[slot] or "")
+                               + sys.getsizeof(self._normalized[slot]))
+
+    def upsert(self, kind: str, entry_id: int, name: str, slug: str, popularity: Optional[float] = None):
+        with self._lock:
+            slot = self._slots.get((kind, entry_id))
+            if slot is not None:
+                if popularity is None:
+                    popularity = self._popularity[slot]
+                self._unlink(slot)
+                self._release_strings(slot)
+            else:
+                slot = self._free.pop() if self._free else len(self._kinds)
+            normalized = self._store(slot, kind, entry_id, name, slug, popularity)
+            self._link(slot, normalized)
+
+    def remove(self, kind: str, entry_id: int):
+        with self._lock:
+            slot = self._slots.pop((kind, entry_id), None)
+            if slot is None:
+                return
+            self._unlink(slot)
+            self._release_strings(slot)
+            for column in self._columns()[:-1]:
+                column[slot] = None
+            self._free.append(slot)
+
+    def set_popularity(self, kind: str, entry_id: int, popularity: float):
+        with self._lock:
+            slot = self._slots.get((kind, entry_id))
+            if slot is None:
+                return
+            normalized = self._normalized[slot]
+            for offset in _word_offsets(normalized):
+                self._ranks[self._find(slot << 8 | offset)] = popularity
+            self._popularity[slot] = popularity
+            self._forget_prefixes(normalized)
+
+    def _top_slots(self, lo: int, hi: int, limit: int) -> List[int]:
+        # A name can sit in the range more than once ("apple apple"), so over-fetch and dedupe
+        slots = []
+        for index in heapq.nlargest(limit * 2, range(lo, hi), key=self._ranks.__getitem__):
+            slot = self._positions[index] >> 8
+            if slot not in slots:
+                slots.append(slot)
+                if len(slots) == limit:
+                    break
+        return slots
+
+    def suggest(self, query: str, limit: int = 10) -> List[dict]:
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        limit = min(limit, self.MAX_LIMIT)
+        with self._lock:
+            lo = bisect_left(self._positions, prefix, key=self._term)
+            hi = bisect_left(self._positions, prefix + "\U0010ffff", lo, key=self._term)
+            if hi - lo > self.MEMO_RANGE:
+                slots = self._memo.get(prefix)
+                if slots is None:
+                    slots = self._memo[prefix] = self._top_slots(lo, hi, self.MAX_LIMIT)
+                slots = slots[:limit]
+            else:
+                slots = self._top_slots(lo, hi, limit)
+            return [
+                {"type": self._kinds[slot], "id": self._ids[slot], "name": self._names[slot], "slug": self._slugs[slot]}
+                for slot in slots
+            ]
+
+    def _word_range(self, word: str) -> Tuple[int, int]:
+        lo = bisect_left(self._positions, word, key=self._term)
+        return lo, bisect_left(self._positions, word + "\U0010ffff", lo, key=self._term)
+
+    def fuzzy(self, query: str, limit: Optional[int] = 20) -> List[dict]:
+        """Products matching every query word, allowing typos, ranked by similarity then popularity.
+
+        Each word is corrected against the vocabulary. Candidates come from the most
+        selective word's index range (the FUZZY_CANDIDATES most popular, memoized for
+        common words) and are then checked for the remaining words, so cost stays
+        bounded on any catalog. ``limit=None`` returns every match.
+        """
+        words = normalize(query).split()
+        if not words:
+            return []
+        with self._lock:
+            alternatives = [self.vocabulary.corrections(word) for word in words]
+            if not all(alternatives):
+                return []
+            
+            # Seed candidates from the word whose corrections cover the fewest positions
+            ranges = [[self._word_range(alternative) for alternative, _ in options] for options in alternatives]
+            seed = min(range(len(words)), key=lambda i: sum(hi - lo for lo, hi in ranges[i]))
+            candidates = set()
+            for (word, _), (lo, hi) in zip(alternatives[seed], ranges[seed]):
+                if hi - lo > self.MEMO_RANGE // 10:
+                    slots = self._fuzzy_memo.get(word)
+                    if slots is None:
+                        slots = self._fuzzy_memo[word] = self._top_slots(lo, hi, self.FUZZY_CANDIDATES)
+                else:
+                    slots = self._top_slots(lo, hi, self.FUZZY_CANDIDATES)
+                candidates.update(slots)
+            
+            scored = []
+            for slot in candidates:
+                if self._kinds[slot] != "product":
+                    continue
+                tokens = self._normalized[slot].split()
+                score = 0.0
+                for options in alternatives:
+                    best = max((similarity for alternative, similarity in options
+                                if any(token.startswith(alternative) for token in tokens)), default=None)
+                    if best is None:
+                        break
+                    score += best
+                else:
+                    scored.append((score, self._popularity[slot], -slot, slot))
+            
+            return [
+                {"type": "product", "id": self._ids[slot], "name": self._names[slot], "slug": self._slugs[slot]}
+                for *_, slot in (sorted(scored, reverse=True) if limit is None else heapq.nlargest(limit, scored))
+            ]
+
+    def stats(self) -> dict:
+        with self._lock:
+            # String sizes are tracked as they change, so this stays cheap enough for every scrape
+            arrays = (self._positions.buffer_info()[1] + self._ranks.buffer_info()[1]) * 8
+            containers = sum(sys.getsizeof(column) for column in self._columns()) + sys.getsizeof(self._slots)
+            return {
+                "entries": len(self._slots),
+                "terms": len(self._positions),
+                "vocabulary": len(self.vocabulary),
+                "memory_bytes": arrays + containers + self._string_bytes,
+                "version": self.version,
+            }
+
+suggest_index = PrefixIndex()
+
+# The index follows the "catalog" cache version, bumped by every product and category write
+INDEX_VERSION_NAME = "catalog"
+
+# Ranked in-process matches are checked against the caller's filters this many IDs at a time
+FUZZY_FILTER_BATCH = 500
+
+_rebuild_lock = threading.Lock()
+_checked_at = 0.0
+
+def _product_popularity(db: Session) -> Dict[int, float]:
+    return dict(db.query(ProductPopularity.product_id, ProductPopularity.score).all())
+
+def rebuild_search_index(db: Session):
+    """Load every available product and every category name into the suggestion index"""
+    version = current_version(db, INDEX_VERSION_NAME)
+    popularity = _product_popularity(db)
+    category_counts = dict(db.query(CategoryStats.category_id, CategoryStats.available_count).all())
+
+    def entries():
+        products = db.query(Product.id, Product.name, Product.slug)\
+            .filter(Product.availability == True)\
+            .yield_per(5000)
+        for product_id, name, slug in products:
+            yield "product", product_id, name, slug, popularity.get(product_id, 0)
+        for category_id, name, slug in db.query(Category.id, Category.name, Category.slug):
+            yield "category", category_id, name, slug, category_counts.get(category_id, 0)
+
+    suggest_index.load(entries())
+    suggest_index.version = version
+
+def _rebuild_in_background():
+    if not _rebuild_lock.acquire(blocking=False):
+        return
+    db = SessionLocal()
+    try:
+        rebuild_search_index(db)
+    finally:
+        db.close()
+        _rebuild_lock.release()
+
+def ensure_search_index(db: Session):
+    """Build on first use; rebuild when another worker changed the catalog.
+
+    Writes on this worker are applied incrementally and keep the index version
+    current, so only foreign writes trigger a rebuild. That rebuild runs in a
+    background thread while the current index keeps serving.
+    """
+    global _checked_at
+    now = time.monotonic()
+    if suggest_index.version < 0:
+        with _rebuild_lock:
+            if suggest_index.version < 0:
+                rebuild_search_index(db)
+                _checked_at = now
+        return
+    if now - _checked_at < settings.CACHE_VERSION_CHECK_SECONDS:
+        return
+    _checked_at = now
+    if suggest_index.version != current_version(db, INDEX_VERSION_NAME):
+        threading.Thread(target=_rebuild_in_background, name="search-index-rebuild", daemon=True).start()
+
+def index_product(db: Session, product: Product):
+    """Apply a committed product write to the index"""
+    if product.availability:
+        suggest_index.upsert("product", product.id, product.name, product.slug)
+    else:
+        suggest_index.remove("product", product.id)
+    _advance_version(db)
+
+def unindex_product(db: Session, product_id: int):
+    suggest_index.remove("product", product_id)
+    _advance_version(db)
+
+def index_category(db: Session, category: Category):
+    suggest_index.upsert("category", category.id, category.name, category.slug)
+    _advance_version(db)
+
+def unindex_category(db: Session, category_id: int, product_ids: Iterable[int] = ()):
+    """Drop a deleted category, and the products deleted along with it, from the index"""
+    suggest_index.remove("category", category_id)
+    for product_id in product_ids:
+        suggest_index.remove("product", product_id)
+    _advance_version(db)
+
+def reindex_popularity(db: Session, product_ids):
+    """Re-rank products after their sales changed; popularity alone doesn't move the index version"""
+    if suggest_index.version < 0 or not product_ids:
+        return
+    rows = db.query(ProductPopularity.product_id, ProductPopularity.score)\
+        .filter(ProductPopularity.product_id.in_(list(product_ids)))\
+        .all()
+    for product_id, score in rows:
+        suggest_index.set_popularity("product", product_id, score)
+
+def _advance_version(db: Session):
+    # Only move forward by our own write; a gap means another worker wrote too and a rebuild is due
+    version = current_version(db, INDEX_VERSION_NAME)
+    if suggest_index.version >= 0 and version == suggest_index.version + 1:
+        suggest_index.version = version
+
+def fuzzy_product_ids(db: Session, query: str, limit: int = 20, base=None) -> List[int]:
+    """Typo-tolerant product search: pg_trgm on Postgres, the in-process vocabulary elsewhere.
+
+    Returns the best ``limit`` matches, best first, among the products of ``base``
+    (a Product query carrying e.g. the store filters; by default every available
+    product), so filtering never cuts matches that rank below the limit.
+    """
+    if base is None:
+        base = db.query(Product).filter(Product.availability == True)
+    if db.get_bind().dialect.name == "postgresql":
+        rows = base.with_entities(Product.id)\
+            .outerjoin(ProductPopularity)\
+            .filter(Product.name.op("%")(query))\
+            .order_by(func.similarity(Product.name, query).desc(), ProductPopularity.score.desc().nulls_last(), Product.id)\
+            .limit(limit)\
+            .all()
+        return [product_id for (product_id,) in rows]
+    ensure_search_index(db)
+    # The index doesn't know the filters: rank every match, then keep the first ones base lets through
+    ranked = [entry["id"] for entry in suggest_index.fuzzy(query, limit=None)]
+    product_ids = []
+    for offset in range(0, len(ranked), FUZZY_FILTER_BATCH):
+        batch = ranked[offset:offset + FUZZY_FILTER_BATCH]
+        allowed = {product_id for (product_id,) in base.with_entities(Product.id).filter(Product.id.in_(batch))}
+        product_ids.extend(product_id for product_id in batch if product_id in allowed)
+        if len(product_ids) >= limit:
+            break
+    return product_ids[:limit]
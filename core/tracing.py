@@ -0,0 +1,285 @@
+import functools
+import inspect
+import json
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from core.config import settings
+
+# OTLP span kinds and status codes
+SPAN_KIND_INTERNAL, SPAN_KIND_SERVER, SPAN_KIND_CLIENT = 1, 2, 3
+STATUS_UNSET, STATUS_OK, STATUS_ERROR = 0, 1, 2
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "attributes", "status")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], kind: int, attributes: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.status = STATUS_UNSET
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def end(self, error: Optional[BaseException] = None):
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.status = STATUS_ERROR
+            self.attributes["exception.type"] = type(error).__name__
+        self.trace.spans.append(self)
+
+class Trace:
+    """Spans of one sampled request, exported together when the request span ends"""
+    __slots__ = ("trace_id", "spans")
+
+    def __init__(self, trace_id: Optional[str] = None):
+        self.trace_id = trace_id or os.urandom(16).hex()
+        self.spans: List[Span] = []
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+def start_span(name: str, kind: int = SPAN_KIND_INTERNAL, **attributes) -> Optional[Span]:
+    """Child of the current span, or None when the request isn't sampled; end it yourself"""
+    parent = _current_span.get()
+    if parent is None:
+        return None
+    return Span(parent.trace, name, parent.span_id, kind, attributes)
+
+class _SpanScope:
+    __slots__ = ("span", "token")
+
+    def __init__(self, span: Span):
+        self.span = span
+
+    def __enter__(self) -> Span:
+        self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self.token)
+        self.span.end(exc)
+        return False
+
+_UNSAMPLED = nullcontext()
+
+def span(name: str, **attributes):
+    """``with span("checkout.total"):`` times a block as a child of the current span.
+
+    Outside a sampled request this is one context variable lookup and a shared no-op.
+    """
+    child = start_span(name, **attributes)
+    return _UNSAMPLED if child is None else _SpanScope(child)
+
+def traced(name: Optional[str] = None):
+    """Decorator giving every call of a function (sync or async) its own span"""
+    def decorate(func):
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+# SQL statements become client spans under whatever span is current
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    child = start_span("db.query", SPAN_KIND_CLIENT, **{"db.system": conn.dialect.name, "db.statement": statement[:1000]})
+    conn.info.setdefault("trace_spans", []).append(child)
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    child = conn.info["trace_spans"].pop()
+    if child is not None:
+        child.end()
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    spans = context.connection.info.get("trace_spans") if context.connection is not None else None
+    if spans:
+        child = spans.pop()
+        if child is not None:
+            child.end(context.original_exception)
+
+class SpanExporter:
+    """Receives each finished trace; subclass and pass to set_exporter() to send spans elsewhere"""
+
+    def export(self, trace: Trace):
+        raise NotImplementedError
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def otlp_json(trace: Trace) -> dict:
+    """A trace as an OTLP/JSON ExportTraceServiceRequest, as accepted by collectors on /v1/traces"""
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": settings.APP_NAME}}]},
+        "scopeSpans": [{
+            "scope": {"name": "freshly.tracing"},
+            "spans": [{
+                "traceId": trace.trace_id,
+                "spanId": s.span_id,
+                "parentSpanId": s.parent_id or "",
+                "name": s.name,
+                "kind": s.kind,
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns),
+                "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in s.attributes.items()],
+                "status": {"code": s.status},
+            } for s in trace.spans],
+        }],
+    }]}
+
+def flat_json(trace: Trace) -> List[dict]:
+    """One plain dict per span, easy to grep or load into a dataframe"""
+    return [{
+        "trace_id": trace.trace_id, "span_id": s.span_id, "parent_id": s.parent_id, "name": s.name,
+        "start_ns": s.start_ns, "duration_ms": (s.end_ns - s.start_ns) / 1e6,
+        "error": s.status == STATUS_ERROR, "attributes": s.attributes,
+    } for s in trace.spans]
+
+class JsonLinesExporter(SpanExporter):
+    """Appends traces to a file from a background thread, so requests never wait on disk.
+
+    ``otlp`` writes one OTLP/JSON request per line (replayable into a collector);
+    ``flat`` writes one line per span. Past ``max_bytes`` the file is renamed to
+    ``<path>.1``, replacing the previous one, so at most twice that is kept.
+    """
+
+    def __init__(self, path: str, format: str = "otlp", max_bytes: int = 0):
+        self.path = path
+        self.format = format
+        self.max_bytes = max_bytes
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        threading.Thread(target=self._write_forever, name="trace-exporter", daemon=True).start()
+
+    def export(self, trace: Trace):
+        self._queue.put(trace)
+
+    def _write_forever(self):
+        while True:
+            self._write(self._queue.get())
+
+    def _write(self, trace: Trace):
+        lines = [otlp_json(trace)] if self.format == "otlp" else flat_json(trace)
+        with open(self.path, "a") as f:
+            for line in lines:
+                f.write(json.dumps(line, default=str, separators=(",", ":")) + "\n")
+            size = f.tell()
+        if self.max_bytes and size >= self.max_bytes:
+            os.replace(self.path, self.path + ".1")
+
+_exporter: Optional[SpanExporter] = None
+
+def set_exporter(exporter: Optional[SpanExporter]):
+    global _exporter
+    _exporter = exporter
+
+def get_exporter() -> SpanExporter:
+    """The exporter set with set_exporter(), else the built-in one, created on the first sampled request"""
+    global _exporter
+    if _exporter is None:
+        _exporter = JsonLinesExporter(settings.TRACE_EXPORT_PATH, settings.TRACE_EXPORT_FORMAT, settings.TRACE_EXPORT_MAX_BYTES)
+    return _exporter
+
+def _parse_traceparent(value: bytes):
+    """(trace id, parent span id, sampled) from a W3C traceparent header, or None"""
+    parts = value.decode("latin-1").strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        return parts[1], parts[2], int(parts[3], 16) & 1 == 1
+    except ValueError:
+        return None
+
+class TracingMiddleware:
+    """Opens a server span for each sampled request, continuing an incoming traceparent.
+
+    Only while tracing is on (TRACE_SAMPLE_RATE above 0, or TRACE_FOLLOW_PARENT)
+    is a request sampled: when the caller's traceparent says so, or failing that
+    with probability TRACE_SAMPLE_RATE. With tracing off, as by default, clients
+    can't switch it on and requests pay nothing; otherwise unsampled requests cost
+    a header scan and at most one random() call.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        rate = settings.TRACE_SAMPLE_RATE
+        if rate <= 0 and not settings.TRACE_FOLLOW_PARENT:
+            await self.app(scope, receive, send)
+            return
+
+        incoming = next((value for key, value in scope["headers"] if key == b"traceparent"), None)
+        parent = _parse_traceparent(incoming) if incoming else None
+        if parent:
+            sampled = parent[2]
+        else:
+            sampled = rate > 0 and random.random() < rate
+        if not sampled:
+            await self.app(scope, receive, send)
+            return
+        exporter = get_exporter()
+
+        trace = Trace(parent[0] if parent else None)
+        root = Span(trace, f"{scope['method']} {scope['path']}", parent[1] if parent else None, SPAN_KIND_SERVER,
+                    {"http.method": scope["method"], "http.target": scope["path"]})
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                root.set_attribute("http.status_code", message["status"])
+                if message["status"] >= 500:
+                    root.status = STATUS_ERROR
+            await send(message)
+
+        token = _current_span.set(root)
+        error = None
+        try:
+            await self.app(scope, receive, send_with_status)
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            _current_span.reset(token)
+            route = getattr(scope.get("route"), "path", None)
+            if route:
+                root.name = f"{scope['method']} {route}"
+                root.set_attribute("http.route", route)
+            root.end(error)
+            exporter.export(trace)
@@ -1,6 +1,8 @@
+from typing import Callable, Dict, List, Optional, Sequence
+
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 
 from core.config import settings
 
@@ -20,3 +22,26 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def upsert(db: Session, model, rows: List[Dict], key: Sequence[str], update: Optional[Callable] = None, batch_size: int = 1000):
+    """INSERT rows, updating the existing row instead when ``key`` already exists (Postgres and SQLite).
+
+    ``update(table, excluded)`` returns the SET clause, where ``excluded`` is the
+    row that was to be inserted; by default it overwrites every other column.
+    Unlike query-then-insert, concurrent writers of the same new key both succeed.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"upsert is not supported on {dialect}")
+    table = model.__table__
+    for offset in range(0, len(rows), batch_size):
+        statement = insert(table).values(rows[offset:offset + batch_size])
+        if update is None:
+            set_ = {name: statement.excluded[name] for name in rows[0] if name not in key}
+        else:
+            set_ = update(table.c, statement.excluded)
+        db.execute(statement.on_conflict_do_update(index_elements=list(key), set_=set_))
@@ -0,0 +1,185 @@
+from sqlalchemy.orm import Session
+
+from core.cache import bump_version
+from models.setting import StoreSetting, GlobalSetting
+from models.language import Language
+from models.attribute import Attribute, AttributeValue
+from models.category import Category, CategoryStats
+from models.order import OrderItem
+from models.product import Product, ProductChange, ProductPopularity
+from core.category_stats import refresh_category_stats
+from core.changes import log_product_changes
+from core.popularity import rebuild_popularity
+
+# Default navbar items
+DEFAULT_NAVBAR = {
+    "logo": "/logo/logo-color.svg",
+    "menu_items": [
+        {"title": "Home", "href": "/"},
+        {"title": "Shop", "href": "/search"},
+        {"title": "About Us", "href": "/about-us"},
+        {"title": "Contact Us", "href": "/contact-us"}
+    ]
+}
+
+# Default footer items
+DEFAULT_FOOTER = {
+    "copyright_text": "© 2025 Freshly Supermarket. All rights reserved.",
+    "social_links": {
+        "facebook": "https://facebook.com",
+        "twitter": "https://twitter.com",
+        "instagram": "https://instagram.com"
+    },
+    "company_info": [
+        {"title": "About Us", "href": "/about-us"},
+        {"title": "Contact Us", "href": "/contact-us"},
+        {"title": "Terms & Conditions", "href": "/terms"},
+        {"title": "Privacy Policy", "href": "/privacy-policy"}
+    ],
+    "customer_care": [
+        {"title": "FAQ", "href": "/faq"},
+        {"title": "Returns", "href": "/returns"},
+        {"title": "Shipping", "href": "/shipping"}
+    ]
+}
+
+def seed_store_settings(db: Session):
+    """Create default store settings and repair legacy navbar/logo values"""
+    db_setting = db.query(StoreSetting).first()
+    if not db_setting:
+        # Create default store settings
+        db_setting = StoreSetting(
+            store_name="Freshly Supermarket",
+            store_email="info@freshlysupermarket.com",
+            meta_title="Freshly Supermarket - Your Go-to Grocery Store",
+            meta_description="Shop fresh groceries, household essentials and more at Freshly Supermarket. Quick delivery, great prices!",
+            navbar=DEFAULT_NAVBAR,
+            footer=DEFAULT_FOOTER,
+            logo="/logo/logo-color.svg"
+        )
+        db.add(db_setting)
+        bump_version(db, "store_settings")
+        return
+    
+    changed = False
+    
+    # If existing settings have no navbar/footer, add defaults
+    if not db_setting.navbar:
+        db_setting.navbar = dict(DEFAULT_NAVBAR)
+        changed = True
+    
+    # Update existing logo paths if they're pointing to non-existent files
+    if db_setting.logo == "/logo.svg":
+        db_setting.logo = "/logo/logo-color.svg"
+        changed = True
+    
+    # Update existing navbar logo if it's pointing to non-existent files
+    if isinstance(db_setting.navbar, dict) and db_setting.navbar.get("logo") == "/logo.svg":
+        # Reassign so the JSON column is flagged as modified
+        db_setting.navbar = {**db_setting.navbar, "logo": "/logo/logo-color.svg"}
+        changed = True
+    
+    if changed:
+        bump_version(db, "store_settings")
+
+def seed_global_settings(db: Session):
+    """Create default global settings if none exist"""
+    if not db.query(GlobalSetting.id).first():
+        db.add(GlobalSetting())
+        bump_version(db, "global_settings")
+
+def seed_languages(db: Session):
+    """Create English (default) and Spanish if no languages exist"""
+    if db.query(Language.id).first():
+        return
+    
+    db.add(Language(
+        name="English",
+        code="en",
+        flag="/flags/en.png",
+        is_default=True,
+        is_active=True
+    ))
+    db.add(Language(
+        name="Spanish",
+        code="es",
+        flag="/flags/es.png",
+        is_default=False,
+        is_active=True
+    ))
+    bump_version(db, "languages")
+
+def seed_attributes(db: Session):
+    """Create the default Size and Color attributes if no attributes exist"""
+    if db.query(Attribute.id).first():
+        return
+    
+    defaults = [
+        ("Size", "size", "Product size options", ["Small", "Medium", "Large"]),
+        ("Color", "color", "Product color options", ["Red", "Blue", "Green", "Yellow", "Black", "White"]),
+    ]
+    for name, slug, description, values in defaults:
+        db.add(Attribute(
+            name=name,
+            slug=slug,
+            display_name=name,
+            description=description,
+            is_active=True,
+            values=[AttributeValue(name=value, value=value.lower(), is_active=True) for value in values]
+        ))
+    bump_version(db, "attributes")
+
+def backfill_category_paths(db: Session):
+    """Compute materialized paths for categories created before paths existed"""
+    if not db.query(Category.id).filter(Category.path.is_(None)).first():
+        return
+    
+    categories = db.query(Category).order_by(Category.id).all()
+    children_by_parent = {}
+    for category in categories:
+        children_by_parent.setdefault(category.parent_id, []).append(category)
+    
+    # Walk down from the roots so every parent's path is set before its children's
+    pending = [(root, "/", 0) for root in children_by_parent.get(None, [])]
+    while pending:
+        category, prefix, depth = pending.pop()
+        category.path = f"{prefix}{category.id}/"
+        category.depth = depth
+        pending.extend((child, category.path, depth + 1) for child in children_by_parent.get(category.id, []))
+    bump_version(db, "categories")
+
+def backfill_category_stats(db: Session):
+    """Compute category aggregates once if they have never been computed"""
+    if db.query(CategoryStats.category_id).first() or not db.query(Category.id).first():
+        return
+    db.flush()
+    refresh_category_stats(db)
+    bump_version(db, "categories")
+
+def backfill_product_popularity(db: Session):
+    """Score existing order history once if popularity has never been computed"""
+    if db.query(ProductPopularity.product_id).first() or not db.query(OrderItem.id).first():
+        return
+    rebuild_popularity(db)
+
+def backfill_product_changes(db: Session):
+    """Start the change feed with every existing product so since=0 is a full sync"""
+    if db.query(ProductChange.id).first():
+        return
+    product_ids = [product_id for (product_id,) in db.query(Product.id).order_by(Product.id)]
+    for i in range(0, len(product_ids), 10000):
+        log_product_changes(db, product_ids[i:i + 10000])
+    # Number them in place: nobody can have read a cursor from an empty feed
+    db.query(ProductChange).update({ProductChange.seq: ProductChange.id}, synchronize_session=False)
+
+def seed_defaults(db: Session):
+    """Seed default rows once at startup so read endpoints never have to write"""
+    seed_store_settings(db)
+    seed_global_settings(db)
+    seed_languages(db)
+    seed_attributes(db)
+    backfill_category_paths(db)
+    backfill_category_stats(db)
+    backfill_product_popularity(db)
+    backfill_product_changes(db)
+    db.commit()
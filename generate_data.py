@@ -0,0 +1,86 @@
+"""Fill an empty database with a large, reproducible synthetic store.
+
+    python generate_data.py --products 1000000 --users 100000 --orders 2000000
+    DATABASE_URL=sqlite:///./big.db python generate_data.py --seed 7 --zipf 1.2
+
+Creates a three-level category tree, products whose name words and sales are
+Zipf-skewed (a few best sellers, a long tail), shoppers sharing one password
+(--password, so any of them can log in) plus admin@bench.local, and orders
+drawn from that distribution. Rows are loaded in batches with multi-row
+INSERTs, or COPY on Postgres. The same --seed gives the same rows.
+
+Category stats, popularity scores and the change feed are computed at the end,
+exactly as app startup would.
+"""
+import argparse
+import os
+import sys
+import time
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main  # noqa: F401  Registers every model with the mapper
+from core.config import settings
+from core.security import get_password_hash
+from database.database import Base, SessionLocal, engine
+from database.seed import seed_defaults
+from models.category import Category
+from models.order import Order
+from models.product import Product
+from models.user import User
+from benchmarks.dataset import seed_categories, seed_orders, seed_products, seed_users
+
+def timed(label, func, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    print(f"{label} in {time.perf_counter() - started:.1f}s")
+    return result
+
+def generate():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--orders", type=int, default=200000)
+    parser.add_argument("--departments", type=int, default=10, help="Top-level categories")
+    parser.add_argument("--aisles", type=int, default=8, help="Subcategories per department")
+    parser.add_argument("--shelves", type=int, default=3, help="Leaf categories per aisle, where products go")
+    parser.add_argument("--max-items", type=int, default=5, help="Most distinct products in one order")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent of product sales; higher is more skewed")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=10000, help="Rows per INSERT or COPY")
+    parser.add_argument("--password", default="password", help="Password of every generated user")
+    args = parser.parse_args()
+
+    # Every bulk batch would otherwise be reported as a slow query
+    settings.SLOW_QUERY_MS = 0
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        for model in (Category, Product, User, Order):
+            if db.query(model.id).first():
+                sys.exit(f"{model.__tablename__} already has rows; generate into an empty database")
+    finally:
+        db.close()
+
+    print(f"Generating into {engine.url.render_as_string(hide_password=True)}")
+    started = time.perf_counter()
+    # One transaction, so a failed run leaves the database empty and can simply be rerun
+    with engine.begin() as conn:
+        leaves = timed(f"{args.departments * (1 + args.aisles * (1 + args.shelves))} categories",
+                       seed_categories, conn, args.departments, args.aisles, args.shelves)
+        timed(f"{args.products} products", seed_products, conn, args.products, leaves,
+              batch_size=args.batch_size, seed=args.seed)
+        user_ids = timed(f"{args.users} users", seed_users, conn, args.users, get_password_hash(args.password),
+                         batch_size=args.batch_size)
+        timed(f"{args.orders} orders", seed_orders, conn, args.orders, user_ids, max_items=args.max_items,
+              zipf_s=args.zipf, batch_size=max(1, args.batch_size // args.max_items), seed=args.seed)
+
+    db = SessionLocal()
+    try:
+        timed("Category stats, popularity and change feed", seed_defaults, db)
+    finally:
+        db.close()
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    generate()
@@ -1,12 +1,22 @@
 from fastapi import FastAPI, Depends
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 import inspect
 
 
 # Import database modules
-from database.database import engine, get_db, Base
+from database.database import engine, get_db, Base, SessionLocal
+from database.seed import seed_defaults
+from core.search import rebuild_search_index, suggest_index
+from core.changes import start_change_sequencer
 from core.config import settings as app_settings
+from core.security import password_pool
+from core.compression import CompressionMiddleware
+from core.metrics import MetricsMiddleware, render_metrics
+from core.query_stats import QueryStatsMiddleware
+from core.profiling import ProfilerMiddleware
+from core.tracing import TracingMiddleware
 
 # Import models to register them with SQLAlchemy
 import models.product  # This registers the Product model with SQLAlchemy
@@ -16,9 +26,10 @@ import models.order   # This registers the Order model with SQLAlchemy
 import models.setting # This registers the Setting model with SQLAlchemy
 import models.language # This registers the Language model with SQLAlchemy
 import models.coupon   # This registers the Coupon model with SQLAlchemy
+import models.cache_version  # This registers the CacheVersion model with SQLAlchemy
 
 # Import routers
-from routers import products, auth, categories, orders, languages, attributes, settings as settings_router, coupons
+from routers import products, auth, categories, orders, languages, attributes, settings as settings_router, coupons, bootstrap
 
 # Create FastAPI app with settings from config
 app = FastAPI(
@@ -38,6 +49,22 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
+# gzip/brotli for large JSON; cached snapshots arrive already compressed and pass through
+app.add_middleware(CompressionMiddleware)
+
+# On-demand sampling profiles of single requests, for admins
+if app_settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilerMiddleware)
+
+# Per-request SQL counts, DB time and N+1 warnings
+app.add_middleware(QueryStatsMiddleware)
+
+# Sampled request traces with spans for auth, SQL and serialization
+app.add_middleware(TracingMiddleware)
+
+# Outermost, so latency includes every other middleware
+app.add_middleware(MetricsMiddleware)
+
 # Create database tables on startup
 @app.on_event("startup")
 async def startup_db_client():
@@ -46,6 +73,20 @@ async def startup_db_client():
     # The 'checkfirst=True' parameter makes sure tables are not recreated if they exist
     if not app_settings.TESTING:  # Don't create tables in test mode
         Base.metadata.create_all(bind=engine, checkfirst=True)
+        
+        # Seed default rows once here instead of inside GET handlers
+        db = SessionLocal()
+        try:
+            seed_defaults(db)
+            
+            # Build the autocomplete index up front so the first keystrokes are fast
+            rebuild_search_index(db)
+            print(f"Search index ready: {suggest_index.stats()}")
+        finally:
+            db.close()
+        
+        # Number committed change feed entries in the background, so feed reads stay read-only
+        start_change_sequencer()
 
 # Include routers
 app.include_router(products.router)
@@ -56,6 +97,7 @@ app.include_router(settings_router.router)
 app.include_router(languages.router)
 app.include_router(attributes.router)
 app.include_router(coupons.router)
+app.include_router(bootstrap.router)
 
 @app.get(
     "/",
@@ -71,4 +113,9 @@ async def root():
     }
 @app.get("/health")
 def health_check():
-    return {"status": "ok"}
+    return {"status": "ok", "password_pool": password_pool.stats()}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -8,6 +8,7 @@ import models.order
 import models.setting
 import models.language
 import models.attribute
+import models.cache_version
 
 def update_database():
     """
@@ -15,7 +15,8 @@ class Attribute(Base, TimestampMixin):
     is_active = Column(Boolean, default=True)
     
     # Relationship with attribute values
-    values = relationship("AttributeValue", back_populates="attribute", cascade="all, delete-orphan")
+    # Loaded with one SELECT ... IN for all attributes in a result instead of one query per attribute
+    values = relationship("AttributeValue", back_populates="attribute", cascade="all, delete-orphan", lazy="selectin")
 
 class AttributeValue(Base, TimestampMixin):
     __tablename__ = "attribute_values"
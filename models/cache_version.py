@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String
+
+from database.database import Base
+from models.base import TimestampMixin
+
+class CacheVersion(Base, TimestampMixin):
+    """Version counter per cached dataset, bumped on every write so all workers can tell their snapshot is stale"""
+    __tablename__ = "cache_versions"
+    
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<CacheVersion {self.name}={self.version}>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey
+from sqlalchemy import Column, Integer, Float, String, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship, backref
 
 from database.database import Base
@@ -14,9 +14,38 @@ class Category(Base, TimestampMixin):
     image_url = Column(String(255), nullable=True)
     parent_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
     
+    # Materialized path of ancestor ids including this one, e.g. "/1/5/12/".
+    # A subtree is every category whose path starts with its root's path.
+    path = Column(String(255), nullable=True)
+    depth = Column(Integer, nullable=False, default=0)
+    
     # Relationships
     products = relationship("Product", back_populates="category", cascade="all, delete-orphan")
     subcategories = relationship("Category", backref=backref("parent", remote_side=[id]))
+    stats = relationship("CategoryStats", uselist=False, back_populates="category", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        # varchar_pattern_ops lets Postgres use the index for LIKE 'prefix%'
+        Index("ix_categories_path", "path", postgresql_ops={"path": "varchar_pattern_ops"}),
+    )
     
     def __repr__(self):
         return f"<Category {self.name}>"
+
+
+class CategoryStats(Base):
+    """Precomputed product aggregates for a category's whole subtree (see core/category_stats.py)"""
+    __tablename__ = "category_stats"
+    
+    category_id = Column(Integer, ForeignKey("categories.id", ondelete="CASCADE"), primary_key=True)
+    product_count = Column(Integer, nullable=False, default=0)  # All products, available or not
+    available_count = Column(Integer, nullable=False, default=0)
+    discounted_count = Column(Integer, nullable=False, default=0)  # Available and discounted
+    min_price = Column(Float, nullable=True)  # Over available products
+    max_price = Column(Float, nullable=True)
+    
+    # Relationships
+    category = relationship("Category", back_populates="stats")
+    
+    def __repr__(self):
+        return f"<CategoryStats {self.category_id}: {self.product_count}>"
@@ -28,7 +28,7 @@ class Order(Base, TimestampMixin):
     
     # Relationships
     user = relationship("User", back_populates="orders")
-    items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
+    items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan", lazy="selectin")
     
     def __repr__(self):
         return f"<Order {self.id}>"
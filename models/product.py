@@ -1,9 +1,20 @@
-from sqlalchemy import Column, Integer, String, Float, Text, Boolean, ForeignKey
+from datetime import datetime, timezone
+
+from sqlalchemy import DDL, Column, Computed, DateTime, Integer, String, Float, Text, Boolean, ForeignKey, Index, event
 from sqlalchemy.orm import relationship
 
 from database.database import Base
 from models.base import TimestampMixin
 
+# Discount percentage, truncated toward zero like int() would, also when discounted_price
+# is above price; shared by the column and update_product_indexes.py. Postgres rounds on
+# CAST, so the truncation is spelled out with FLOOR on the value's magnitude.
+DISCOUNT_PERCENTAGE_SQL = (
+    "CASE WHEN discounted_price > 0 AND price > 0 THEN CAST(CASE "
+    "WHEN discounted_price <= price THEN FLOOR(100 - (discounted_price * 100) / price) "
+    "ELSE -FLOOR((discounted_price * 100) / price - 100) END AS INTEGER) ELSE 0 END"
+)
+
 class Product(Base, TimestampMixin):
     __tablename__ = "products"
     
@@ -20,15 +31,84 @@ class Product(Base, TimestampMixin):
     unit = Column(String(50), nullable=True, default="piece")  # e.g., kg, piece, dozen
     short_description = Column(String(255), nullable=True)
     
+    # Stored generated column so listings can sort by discount straight off an index
+    discount_percentage = Column(Integer, Computed(DISCOUNT_PERCENTAGE_SQL, persisted=True))
+    
     # Relationships
-    category = relationship("Category", back_populates="products")
+    category = relationship("Category", back_populates="products", lazy="selectin")  # Serialized with every product
+    popularity = relationship("ProductPopularity", uselist=False, back_populates="product", cascade="all, delete-orphan")
+    
+    # Store listings always filter on availability, so each sort order gets an
+    # (availability, sort key, id) index and can be read in index order
+    __table_args__ = (
+        Index("ix_products_availability_created_at", "availability", "created_at", "id"),
+        Index("ix_products_availability_price", "availability", "price", "id"),
+        Index("ix_products_availability_discount", "availability", "discount_percentage", "id"),
+        Index("ix_products_availability_name", "availability", "name", "id"),
+        # Category-filtered listings, optionally narrowed by price range
+        Index("ix_products_category_availability_price", "category_id", "availability", "price"),
+        # Trigram index for typo-tolerant search (Postgres only, needs pg_trgm)
+        Index("ix_products_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"})
+        .ddl_if(dialect="postgresql"),
+    )
     
     def __repr__(self):
         return f"<Product {self.name}>"
+
+
+class ProductPopularity(Base):
+    """Forward-decayed sales score per product, maintained by orders (see core/popularity.py)"""
+    __tablename__ = "product_popularity"
     
-    @property
-    def discount_percentage(self):
-        """Calculate discount percentage if discounted_price is set"""
-        if self.discounted_price > 0 and self.price > 0:
-            return int(100 - ((self.discounted_price * 100) / self.price))
-        return 0
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    score = Column(Float, nullable=False, default=0)
+    units_sold = Column(Integer, nullable=False, default=0)  # Lifetime, net of cancellations
+    
+    # Relationships
+    product = relationship("Product", back_populates="popularity")
+    
+    __table_args__ = (
+        Index("ix_product_popularity_score", "score"),
+    )
+    
+    def __repr__(self):
+        return f"<ProductPopularity {self.product_id}: {self.score}>"
+
+
+class ProductRelated(Base):
+    """Top co-purchased products per product, written offline by build_related_products.py"""
+    __tablename__ = "product_related"
+    
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    related_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    score = Column(Integer, nullable=False)  # Orders containing both products
+    
+    __table_args__ = (
+        # GET /products/{id}/related reads one product's neighbours in score order
+        Index("ix_product_related_product_score", "product_id", "score"),
+    )
+    
+    def __repr__(self):
+        return f"<ProductRelated {self.product_id} -> {self.related_id}: {self.score}>"
+
+
+class ProductChange(Base):
+    """Append-only product change log behind GET /products/changes (see core/changes.py)"""
+    __tablename__ = "product_changes"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)  # Insert order, which isn't commit order
+    # The feed cursor, numbered in commit order once the writing transaction has committed (see core/changes.py)
+    seq = Column(Integer, nullable=True, unique=True)
+    product_id = Column(Integer, nullable=False)  # No foreign key: tombstones outlive their product
+    deleted = Column(Boolean, nullable=False, default=False)
+    changed_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+    
+    def __repr__(self):
+        return f"<ProductChange {self.seq}: {self.product_id}>"
+
+# The trigram index above needs the extension before the table is created
+event.listen(
+    Product.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean
+from sqlalchemy import Column, Integer, String, Boolean, Index, func
 from sqlalchemy.orm import relationship
 
 from database.database import Base
@@ -19,5 +19,11 @@ class User(Base, TimestampMixin):
     # Relationships
     orders = relationship("Order", back_populates="user")
     
+    # Case-insensitive identity: login and signup conflicts are resolved on lower(email)/lower(username)
+    __table_args__ = (
+        Index("ix_users_email_lower", func.lower(email), unique=True),
+        Index("ix_users_username_lower", func.lower(username), unique=True),
+    )
+    
     def __repr__(self):
         return f"<User {self.username}>"
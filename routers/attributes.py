@@ -1,5 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.orm import Session, selectinload
 from typing import List, Optional
 
 from database.database import get_db
@@ -7,6 +7,7 @@ from models.attribute import Attribute, AttributeValue
 from schemas.attribute import Attribute as AttributeSchema
 from schemas.attribute import AttributeCreate, AttributeUpdate
 from core.security import get_current_active_user, get_current_admin_user
+from core.cache import VersionedCache, bump_version, cached_response
 
 router = APIRouter(
     prefix="/attributes",
@@ -14,6 +15,21 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+# Default attributes are seeded at startup (database/seed.py); the storefront list is cached
+def _load_showing_attributes(db: Session):
+    attributes = db.query(Attribute)\
+        .options(selectinload(Attribute.values))\
+        .filter(Attribute.is_active == True)\
+        .all()
+    return [AttributeSchema.model_validate(attribute).model_dump() for attribute in attributes]
+
+showing_attributes_cache = VersionedCache("attributes", _load_showing_attributes)
+
+def _attributes_changed(db: Session):
+    bump_version(db, "attributes")
+    db.commit()
+    showing_attributes_cache.refresh(db)
+
 @router.get("/", response_model=List[AttributeSchema])
 async def get_all_attributes(
     skip: int = 0,
@@ -26,64 +42,12 @@ async def get_all_attributes(
     return attributes
 
 @router.get("/show", response_model=List[AttributeSchema])
-async def get_showing_attributes(
+def get_showing_attributes(
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """Get all active attributes for display in the store"""
-    attributes = db.query(Attribute).filter(Attribute.is_active == True).all()
-    
-    # If no attributes exist, create some default ones
-    if len(attributes) == 0:
-        # Create Size attribute
-        size_attr = Attribute(
-            name="Size",
-            slug="size",
-            display_name="Size",
-            description="Product size options",
-            is_active=True
-        )
-        db.add(size_attr)
-        db.flush()  # Flush to get the ID
-        
-        # Add size values
-        sizes = ["Small", "Medium", "Large"]
-        for size in sizes:
-            size_value = AttributeValue(
-                name=size,
-                value=size.lower(),
-                attribute_id=size_attr.id,
-                is_active=True
-            )
-            db.add(size_value)
-        
-        # Create Color attribute
-        color_attr = Attribute(
-            name="Color",
-            slug="color",
-            display_name="Color",
-            description="Product color options",
-            is_active=True
-        )
-        db.add(color_attr)
-        db.flush()  # Flush to get the ID
-        
-        # Add color values
-        colors = ["Red", "Blue", "Green", "Yellow", "Black", "White"]
-        for color in colors:
-            color_value = AttributeValue(
-                name=color,
-                value=color.lower(),
-                attribute_id=color_attr.id,
-                is_active=True
-            )
-            db.add(color_value)
-        
-        db.commit()
-        
-        # Fetch the newly created attributes
-        attributes = db.query(Attribute).filter(Attribute.is_active == True).all()
-    
-    return attributes
+    return cached_response(request, showing_attributes_cache.get(db))
 
 @router.get("/{attribute_id}", response_model=AttributeSchema)
 async def get_attribute_by_id(
@@ -132,7 +96,7 @@ async def create_attribute(
         )
         db.add(db_value)
     
-    db.commit()
+    _attributes_changed(db)
     db.refresh(db_attribute)
     return db_attribute
 
@@ -153,7 +117,7 @@ async def update_attribute(
     for field, value in update_data.items():
         setattr(db_attribute, field, value)
     
-    db.commit()
+    _attributes_changed(db)
     db.refresh(db_attribute)
     return db_attribute
 
@@ -169,5 +133,5 @@ async def delete_attribute(
         raise HTTPException(status_code=404, detail="Attribute not found")
     
     db.delete(db_attribute)
-    db.commit()
+    _attributes_changed(db)
     return None
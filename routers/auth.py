@@ -1,9 +1,13 @@
 from datetime import timedelta
+from typing import Optional
+import anyio.from_thread
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import func, or_, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from core.security import get_password_hash, verify_password, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
+from core.security import get_password_hash_async, verify_password_async, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
 from database.database import get_db
 from models.user import User
 from schemas.user import UserCreate, User as UserSchema, Token, UserLogin
@@ -14,46 +18,59 @@ router = APIRouter(
     responses={401: {"description": "Unauthorized"}},
 )
 
+def _registration_conflict(db: Session, user: UserCreate) -> Optional[str]:
+    # Only reached after a failed insert, to tell the client which field clashed;
+    # None when neither did, i.e. the insert failed for some other reason
+    if db.query(User.id).filter(func.lower(User.email) == user.email.lower()).first():
+        return "Email already registered"
+    if db.query(User.id).filter(func.lower(User.username) == user.username.lower()).first():
+        return "Username already registered"
+    return None
+
+def _find_user_by_identity(db: Session, identity: str):
+    """Resolve an email or username (case-insensitive) with a single indexed query"""
+    identity = identity.strip().lower()
+    matches = db.query(User).filter(
+        or_(func.lower(User.email) == identity, func.lower(User.username) == identity)
+    ).limit(2).all()
+    # An email match wins over someone else's username that happens to look the same
+    for match in matches:
+        if match.email.lower() == identity:
+            return match
+    return matches[0] if matches else None
+
 @router.post("/register", response_model=UserSchema, status_code=status.HTTP_201_CREATED)
 def register_user(user: UserCreate, db: Session = Depends(get_db)):
-    # Check if user with email already exists
-    db_user_email = db.query(User).filter(User.email == user.email).first()
-    if db_user_email:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
-        )
-    
-    # Check if user with username already exists
-    db_user_username = db.query(User).filter(User.username == user.username).first()
-    if db_user_username:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already registered"
-        )
-    
-    # Check if this is the first user (make them admin if so)
-    user_count = db.query(User).count()
-    is_first_user = user_count == 0
-    
-    # Create new user
-    hashed_password = get_password_hash(user.password)
+    # Create new user; the handler runs in the threadpool, bcrypt on its own bounded pool
+    hashed_password = anyio.from_thread.run(get_password_hash_async, user.password)
     db_user = User(
         email=user.email,
         username=user.username,
         hashed_password=hashed_password,
         first_name=user.first_name,
         last_name=user.last_name,
-        is_admin=is_first_user  # Make the first user admin
+        # Make the first user admin - evaluated inside the INSERT, no table count needed
+        is_admin=~select(User.id).exists()
     )
     
-    # Add to database
+    # Add to database in one round trip; the unique indexes on lower(email)
+    # and lower(username) reject duplicates
     db.add(db_user)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        conflict = _registration_conflict(db, user)
+        if conflict is None:
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=conflict
+        )
     db.refresh(db_user)
     
     # Log if first admin user was created
-    if is_first_user:
+    if db_user.is_admin:
         print(f"Created first admin user: {db_user.email}")
     
     return db_user
@@ -61,13 +78,15 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
 @router.post("/token", response_model=Token)
 def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     # Find user by email/username
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user:
-        # Try with username
-        user = db.query(User).filter(User.username == form_data.username).first()
+    user = _find_user_by_identity(db, form_data.username)
     
     # If no user found or password is wrong
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    password_ok, new_hash = (False, None)
+    if user:
+        password_ok, new_hash = anyio.from_thread.run(
+            verify_password_async, form_data.password, user.hashed_password
+        )
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email/username or password",
@@ -81,6 +100,11 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db:
             detail="Inactive user"
         )
     
+    # Upgrade the stored hash if it was made with a different bcrypt cost
+    if new_hash:
+        user.hashed_password = new_hash
+        db.commit()
+    
     # Create access token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -96,10 +120,15 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db:
 @router.post("/login", response_model=Token)
 def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     # Find user by email
-    user = db.query(User).filter(User.email == user_credentials.email).first()
+    user = db.query(User).filter(func.lower(User.email) == user_credentials.email.lower()).first()
     
     # If no user found or password is wrong
-    if not user or not verify_password(user_credentials.password, user.hashed_password):
+    password_ok, new_hash = (False, None)
+    if user:
+        password_ok, new_hash = anyio.from_thread.run(
+            verify_password_async, user_credentials.password, user.hashed_password
+        )
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -113,6 +142,11 @@ def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
             detail="Inactive user"
         )
     
+    # Upgrade the stored hash if it was made with a different bcrypt cost
+    if new_hash:
+        user.hashed_password = new_hash
+        db.commit()
+    
     # Create access token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
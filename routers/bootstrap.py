@@ -0,0 +1,56 @@
+import hashlib
+import threading
+
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy.orm import Session
+
+from core.compression import precompressed_response
+from database.database import get_db
+from routers.settings import store_settings_cache, global_settings_cache
+from routers.languages import active_languages_cache
+from routers.categories import category_tree_cache
+from routers.coupons import active_coupons_cache
+from routers.attributes import showing_attributes_cache
+
+router = APIRouter(
+    tags=["Storefront"],
+)
+
+# Payload key -> cache that already serves the matching storefront endpoint
+BOOTSTRAP_FRAGMENTS = (
+    ("storeSetting", store_settings_cache),      # /setting/store-setting/all
+    ("globalSetting", global_settings_cache),    # /setting/global/all
+    ("languages", active_languages_cache),       # /language/show
+    ("categories", category_tree_cache),         # /category/show
+    ("coupons", active_coupons_cache),           # /coupon/show
+    ("attributes", showing_attributes_cache),    # /attributes/show
+)
+
+# Last assembled payload and its compressed variants, reused while none of the fragments change
+_assembled = (None, b"", {})
+_assembled_lock = threading.Lock()
+
+def _assemble(snapshots):
+    global _assembled
+    etag = '"%s"' % hashlib.blake2b(
+        "|".join(snapshot.etag for _, snapshot in snapshots).encode("utf-8"), digest_size=8
+    ).hexdigest()
+    cached_etag, body, variants = _assembled
+    if cached_etag == etag:
+        return etag, body, variants
+    # Splice the pre-encoded fragment bodies; nothing is re-serialized
+    body = b"{" + b",".join(b'"%s":%s' % (key.encode("utf-8"), snapshot.body) for key, snapshot in snapshots) + b"}"
+    variants = {}
+    with _assembled_lock:
+        _assembled = (etag, body, variants)
+    return etag, body, variants
+
+@router.get(
+    "/bootstrap",
+    summary="Storefront bootstrap",
+    description="Settings, languages, categories, coupons and attributes for a cold page load in a single response.",
+)
+def get_bootstrap(request: Request, db: Session = Depends(get_db)):
+    snapshots = [(key, cache.get(db)) for key, cache in BOOTSTRAP_FRAGMENTS]
+    etag, body, variants = _assemble(snapshots)
+    return precompressed_response(request, body, etag, variants)
@@ -1,5 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session, aliased, joinedload
 from typing import List, Dict, Any
 pydantic_version = __import__('pydantic').__version__
 if pydantic_version.startswith('2'):
@@ -9,8 +10,15 @@ else:
 
 from database.database import get_db
 from models.category import Category
-from schemas.category import CategoryCreate, CategoryUpdate, Category as CategorySchema
+from models.product import Product
+from schemas.category import CategoryCreate, CategoryUpdate, Category as CategorySchema, CategoryWithStats, CategoryStats as CategoryStatsSchema
 from core.security import get_current_admin_user, get_current_user
+from core.cache import VersionedCache, bump_version, cached_response, single_flight
+from core.category_stats import refresh_category_stats
+from core.changes import log_product_changes
+from core.events import publish_product_changes
+from core.search import index_category, unindex_category
+from core.tracing import traced
 
 router = APIRouter(
     prefix="/category",
@@ -19,6 +27,7 @@ router = APIRouter(
 )
 
 # Helper function to transform category data for frontend
+@traced("transform_category")
 def transform_category(category):
     if isinstance(category, dict):
         category_dict = category
@@ -44,6 +53,46 @@ def transform_child_category(category):
         "icon": category.image_url
     }
 
+def _parent_path(db: Session, parent_id):
+    """Path prefix and depth for a category placed under parent_id"""
+    if parent_id is None:
+        return "/", 0
+    parent = db.query(Category.path, Category.depth).filter(Category.id == parent_id).first()
+    if parent is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Parent category not found"
+        )
+    return parent.path, parent.depth + 1
+
+def _assign_path(db: Session, db_category: Category):
+    prefix, depth = _parent_path(db, db_category.parent_id)
+    db_category.path = f"{prefix}{db_category.id}/"
+    db_category.depth = depth
+
+def _move_subtree(db: Session, db_category: Category, old_path: str, old_depth: int):
+    """Rewrite descendants' paths in one UPDATE after a category changed parent"""
+    db.query(Category)\
+        .filter(Category.path.like(old_path + "%"), Category.id != db_category.id)\
+        .update({
+            Category.path: db_category.path + func.substr(Category.path, len(old_path) + 1),
+            Category.depth: Category.depth + (db_category.depth - old_depth),
+        }, synchronize_session=False)
+
+def category_subtree_filter(*categories: str):
+    """Predicate matching products in any of the given categories (IDs or slugs) or their descendants"""
+    ids, slugs = [], []
+    for category in categories:
+        try:
+            ids.append(int(category))
+        except ValueError:
+            slugs.append(category)
+    root = aliased(Category)
+    subtree_ids = select(Category.id)\
+        .join(root, Category.path.like(root.path + "%"))\
+        .where(or_(root.id.in_(ids), root.slug.in_(slugs)))
+    return Product.category_id.in_(subtree_ids)
+
 @router.post("/", response_model=CategorySchema, status_code=status.HTTP_201_CREATED)
 def create_category(
     category: CategoryCreate, 
@@ -61,56 +110,81 @@ def create_category(
     # Create new category
     db_category = Category(**category.model_dump())
     db.add(db_category)
-    db.commit()
+    db.flush()  # Flush to get the ID for the path
+    _assign_path(db, db_category)
+    db.flush()  # The stats refresh reads the path from the database
+    refresh_category_stats(db, [db_category.id])
+    _categories_changed(db)
     db.refresh(db_category)
+    index_category(db, db_category)
     return db_category
 
-@router.get("/", response_model=List[CategorySchema])
+@router.get("/", response_model=List[CategoryWithStats])
+@single_flight()
 def read_categories(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    categories = db.query(Category).offset(skip).limit(limit).all()
-    return categories
+    # Stats come in through the same query via a LEFT JOIN
+    categories = db.query(Category).options(joinedload(Category.stats)).offset(skip).limit(limit).all()
+    # Validated here, inside the session, since concurrent identical requests share the result
+    return [CategoryWithStats.model_validate(category) for category in categories]
 
 # Define a custom response model for frontend-compatible category data
 class FrontendCategoryResponse(BaseModel):
     class Config:
         arbitrary_types_allowed = True
 
-@router.get("/show")
-def show_categories(db: Session = Depends(get_db)):
-    """
-    Get active categories in hierarchical structure for frontend display
-    Returns parent categories with their children categories nested
-    Transforms data to match frontend expectations (_id, icon fields)
-    """
-    # Get all parent categories (those with no parent_id or null parent_id)
-    parent_categories = db.query(Category).filter(Category.parent_id.is_(None)).all()
-    
-    # Get all categories to build the hierarchy
-    all_categories = db.query(Category).all()
+def _stats_dict(category):
+    if category.stats is None:
+        return CategoryStatsSchema().model_dump()
+    return CategoryStatsSchema.model_validate(category.stats).model_dump()
+
+def _load_category_tree(db: Session):
+    """Full category tree of any depth, in the shape the frontend expects"""
+    all_categories = db.query(Category).options(joinedload(Category.stats)).order_by(Category.id).all()
     
     # Build a dictionary of child categories by parent_id
     children_by_parent = {}
     for category in all_categories:
         if category.parent_id is not None:
-            if category.parent_id not in children_by_parent:
-                children_by_parent[category.parent_id] = []
-            children_by_parent[category.parent_id].append(category)
+            children_by_parent.setdefault(category.parent_id, []).append(category)
+    
+    def build_children(parent_id):
+        children = []
+        for child in children_by_parent.get(parent_id, []):
+            child_dict = transform_child_category(child)
+            child_dict['stats'] = _stats_dict(child)
+            child_dict['children'] = build_children(child.id)
+            children.append(child_dict)
+        return children
     
     # Transform categories to match frontend expectations
     transformed_categories = []
-    for parent in parent_categories:
+    for parent in all_categories:
+        if parent.parent_id is not None:
+            continue
         parent_dict = transform_category(parent)
-        
-        # Transform child categories
-        transformed_children = []
-        for child in children_by_parent.get(parent.id, []):
-            transformed_children.append(transform_child_category(child))
-        
-        parent_dict['children'] = transformed_children
+        parent_dict['stats'] = _stats_dict(parent)
+        parent_dict['children'] = build_children(parent.id)
         transformed_categories.append(parent_dict)
     
     return transformed_categories
 
+category_tree_cache = VersionedCache("categories", _load_category_tree)
+
+def _categories_changed(db: Session):
+    bump_version(db, "categories")
+    bump_version(db, "catalog")
+    db.commit()
+    category_tree_cache.invalidate()
+
+@router.get("/show")
+def show_categories(request: Request, db: Session = Depends(get_db)):
+    """
+    Get active categories in hierarchical structure for frontend display
+    Returns parent categories with their children nested to any depth
+    Transforms data to match frontend expectations (_id, icon fields)
+    """
+    return cached_response(request, category_tree_cache.get(db))
+
 @router.get("/{category_id}", response_model=CategorySchema)
 def read_category(category_id: int, db: Session = Depends(get_db)):
     db_category = db.query(Category).filter(Category.id == category_id).first()
@@ -130,11 +204,29 @@ def update_category(
         raise HTTPException(status_code=404, detail="Category not found")
     
     update_data = category.model_dump(exclude_unset=True)
+    moved = "parent_id" in update_data and update_data["parent_id"] != db_category.parent_id
+    old_path, old_depth = db_category.path, db_category.depth
     for key, value in update_data.items():
         setattr(db_category, key, value)
     
-    db.commit()
+    # Re-parenting rewrites the path of the whole subtree
+    if moved:
+        prefix, _ = _parent_path(db, db_category.parent_id)
+        if db_category.parent_id == db_category.id or (old_path and prefix.startswith(old_path)):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="A category cannot be moved under itself or its subcategories"
+            )
+        _assign_path(db, db_category)
+        if old_path:
+            _move_subtree(db, db_category, old_path, old_depth)
+        # Both the old and the new ancestors' subtree totals changed
+        db.flush()
+        refresh_category_stats(db)
+    
+    _categories_changed(db)
     db.refresh(db_category)
+    index_category(db, db_category)
     return db_category
 
 @router.delete("/{category_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -147,6 +239,13 @@ def delete_category(
     if db_category is None:
         raise HTTPException(status_code=404, detail="Category not found")
     
+    # The cascade deletes the category's own products; feed clients need their tombstones
+    product_ids = [product.id for product in db_category.products]
+    log_product_changes(db, product_ids, deleted=True)
     db.delete(db_category)
-    db.commit()
+    db.flush()
+    refresh_category_stats(db)
+    _categories_changed(db)
+    unindex_category(db, category_id, product_ids)
+    publish_product_changes(db, product_ids)
     return None
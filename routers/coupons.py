@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import datetime
@@ -6,6 +6,7 @@ from datetime import datetime
 from database.database import get_db
 from models.coupon import Coupon
 from schemas.coupon import CouponCreate, CouponUpdate, Coupon as CouponSchema
+from core.cache import VersionedCache, bump_version, cached_response
 
 router = APIRouter(
     prefix="/coupon",
@@ -13,11 +14,30 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+# Coupons start and end by date alone, so the cached list is also rebuilt on a timer
+ACTIVE_COUPONS_TTL_SECONDS = 60
+
+def _load_active_coupons(db: Session):
+    now = datetime.now()
+    coupons = db.query(Coupon).filter(
+        Coupon.active == True,
+        (Coupon.start_date <= now) | (Coupon.start_date == None),
+        (Coupon.end_date >= now) | (Coupon.end_date == None)
+    ).all()
+    return [CouponSchema.model_validate(coupon).model_dump() for coupon in coupons]
+
+active_coupons_cache = VersionedCache("coupons", _load_active_coupons, ttl=ACTIVE_COUPONS_TTL_SECONDS)
+
+def _coupons_changed(db: Session):
+    bump_version(db, "coupons")
+    db.commit()
+    active_coupons_cache.invalidate()
+
 @router.post("/", response_model=CouponSchema, status_code=status.HTTP_201_CREATED)
 def create_coupon(coupon: CouponCreate, db: Session = Depends(get_db)):
     db_coupon = Coupon(**coupon.model_dump())
     db.add(db_coupon)
-    db.commit()
+    _coupons_changed(db)
     db.refresh(db_coupon)
     return db_coupon
 
@@ -27,15 +47,9 @@ def get_all_coupons(skip: int = 0, limit: int = 100, db: Session = Depends(get_d
     return coupons
 
 @router.get("/show", response_model=List[CouponSchema])
-def get_showing_coupons(db: Session = Depends(get_db)):
+def get_showing_coupons(request: Request, db: Session = Depends(get_db)):
     """Get active coupons for the store front"""
-    now = datetime.now()
-    coupons = db.query(Coupon).filter(
-        Coupon.active == True,
-        (Coupon.start_date <= now) | (Coupon.start_date == None),
-        (Coupon.end_date >= now) | (Coupon.end_date == None)
-    ).all()
-    return coupons
+    return cached_response(request, active_coupons_cache.get(db))
 
 @router.get("/{coupon_id}", response_model=CouponSchema)
 def get_coupon(coupon_id: int, db: Session = Depends(get_db)):
@@ -54,7 +68,7 @@ def update_coupon(coupon_id: int, coupon: CouponUpdate, db: Session = Depends(ge
     for key, value in update_data.items():
         setattr(db_coupon, key, value)
     
-    db.commit()
+    _coupons_changed(db)
     db.refresh(db_coupon)
     return db_coupon
 
@@ -65,5 +79,5 @@ def delete_coupon(coupon_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Coupon not found")
     
     db.delete(db_coupon)
-    db.commit()
+    _coupons_changed(db)
     return None
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from typing import List
 
@@ -6,6 +6,7 @@ from database.database import get_db
 from models.language import Language
 from schemas.language import Language as LanguageSchema, LanguageCreate, LanguageUpdate
 from core.security import get_current_admin_user
+from core.cache import VersionedCache, bump_version, cached_response
 
 router = APIRouter(
     prefix="/language",
@@ -13,41 +14,22 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-# Initialize default languages if none exist
-async def get_or_create_default_language(db: Session):
-    # Check if we already have languages
-    db_languages = db.query(Language).all()
-    if not db_languages:
-        # Create English as default language
-        english = Language(
-            name="English",
-            code="en",
-            flag="/flags/en.png",
-            is_default=True,
-            is_active=True
-        )
-        db.add(english)
-        
-        # Create Spanish as additional language
-        spanish = Language(
-            name="Spanish",
-            code="es",
-            flag="/flags/es.png",
-            is_default=False,
-            is_active=True
-        )
-        db.add(spanish)
-        
-        db.commit()
-    
-    # Get active languages
-    return db.query(Language).filter(Language.is_active == True).all()
+# Languages are seeded at startup (database/seed.py); the storefront list is cached
+def _load_active_languages(db: Session):
+    languages = db.query(Language).filter(Language.is_active == True).all()
+    return [LanguageSchema.model_validate(language).model_dump() for language in languages]
+
+active_languages_cache = VersionedCache("languages", _load_active_languages)
+
+def _languages_changed(db: Session):
+    bump_version(db, "languages")
+    db.commit()
+    active_languages_cache.refresh(db)
 
 @router.get("/show", response_model=List[LanguageSchema])
-async def get_active_languages(db: Session = Depends(get_db)):
+def get_active_languages(request: Request, db: Session = Depends(get_db)):
     """Get all active languages"""
-    languages = await get_or_create_default_language(db)
-    return languages
+    return cached_response(request, active_languages_cache.get(db))
 
 @router.get("/all", response_model=List[LanguageSchema])
 async def get_all_languages(
@@ -82,7 +64,7 @@ async def create_language(
     # Create new language
     db_language = Language(**language.model_dump())
     db.add(db_language)
-    db.commit()
+    _languages_changed(db)
     db.refresh(db_language)
     
     return db_language
@@ -128,7 +110,7 @@ async def update_language(
     for key, value in update_data.items():
         setattr(db_language, key, value)
     
-    db.commit()
+    _languages_changed(db)
     db.refresh(db_language)
     
     return db_language
@@ -155,6 +137,6 @@ async def delete_language(
         )
     
     db.delete(db_language)
-    db.commit()
+    _languages_changed(db)
     
     return None
@@ -7,6 +7,10 @@ from models.order import Order, OrderItem, OrderStatus
 from models.product import Product
 from schemas.order import OrderCreate, OrderUpdate, Order as OrderSchema
 from core.security import get_current_user
+from core.changes import log_product_changes
+from core.events import publish_product_changes
+from core.popularity import order_quantities, record_sales
+from core.search import reindex_popularity
 
 router = APIRouter(
     prefix="/orders",
@@ -74,8 +78,17 @@ def create_order(order: OrderCreate, db: Session = Depends(get_db), current_user
         )
         db.add(db_order_item)
     
+    # Count the sale toward popularity, weighted by when the order was placed
+    db.flush()
+    db.refresh(db_order)
+    quantities = order_quantities(db_order)
+    record_sales(db, quantities, db_order.created_at)
+    log_product_changes(db, quantities)  # Stock went down
+    
     db.commit()
     db.refresh(db_order)
+    reindex_popularity(db, quantities)
+    publish_product_changes(db, quantities)
     
     return db_order
 
@@ -128,12 +141,24 @@ def update_order(order_id: int, order: OrderUpdate, db: Session = Depends(get_db
             detail="Only administrators can change order status"
         )
     
+    # Cancelling through a status change takes the sale back out of popularity too,
+    # and moving an order out of cancelled counts it again
+    was_cancelled = db_order.status == OrderStatus.CANCELLED.value
+    is_cancelled = update_data.get("status", db_order.status) == OrderStatus.CANCELLED.value
+    
     # Update order fields
     for key, value in update_data.items():
         setattr(db_order, key, value)
     
+    quantities = {}
+    if was_cancelled != is_cancelled:
+        sign = -1 if is_cancelled else 1
+        quantities = order_quantities(db_order)
+        record_sales(db, {product_id: sign * quantity for product_id, quantity in quantities.items()}, db_order.created_at)
+    
     db.commit()
     db.refresh(db_order)
+    reindex_popularity(db, quantities)
     return db_order
 
 @router.delete("/{order_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -150,6 +175,12 @@ def cancel_order(order_id: int, db: Session = Depends(get_db), current_user: dic
             detail="Not authorized to cancel this order"
         )
     
+    # Take the sale back out of popularity, at the weight it was counted with
+    quantities = {}
+    if db_order.status != OrderStatus.CANCELLED.value:
+        quantities = order_quantities(db_order)
+        record_sales(db, {product_id: -quantity for product_id, quantity in quantities.items()}, db_order.created_at)
+    
     # Instead of deleting, change status to CANCELLED
     db_order.status = OrderStatus.CANCELLED.value
     
@@ -158,6 +189,10 @@ def cancel_order(order_id: int, db: Session = Depends(get_db), current_user: dic
         product = db.query(Product).filter(Product.id == item.product_id).first()
         if product:
             product.stock_quantity += item.quantity
+    product_ids = [item.product_id for item in db_order.items]
+    log_product_changes(db, product_ids)
     
     db.commit()
+    reindex_popularity(db, quantities)
+    publish_product_changes(db, product_ids)
     return None
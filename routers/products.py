@@ -1,12 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import asyncio
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from sqlalchemy import or_, and_
 
-from database.database import get_db
-from models.product import Product
-from models.category import Category
-from schemas.product import ProductCreate, ProductUpdate, Product as ProductSchema
+from database.database import SessionLocal, get_db
+from models.product import Product, ProductPopularity, ProductRelated
+from schemas.product import ProductCreate, ProductUpdate, Product as ProductSchema, ProductSort
+from routers.categories import category_subtree_filter
+from core.cache import VersionedCache, bump_version, single_flight
+from core.category_stats import apply_product_stats_change, product_stats_state
+from core.changes import log_product_changes, read_product_changes
+from core.config import settings
+from core.events import product_events, publish_product_changes
+from core.tracing import traced
+from core.search import ensure_search_index, fuzzy_product_ids, index_product, suggest_index, unindex_product
 
 router = APIRouter(
     prefix="/products",
@@ -19,6 +31,7 @@ from pydantic import BaseModel
 from typing import Dict, Any, List as PyList
 
 # Helper function to transform product data
+@traced("transform_product")
 def transform_product(product):
     product_dict = ProductSchema.model_validate(product).model_dump()
     
@@ -40,6 +53,75 @@ def transform_product(product):
         
     return product_dict
 
+def _catalog_changed(db: Session, old_state=None, new_state=None):
+    """Keep category aggregates in step with a product write, given its product_stats_state before and after; call before commit"""
+    db.flush()
+    apply_product_stats_change(db, old_state, new_state)
+    bump_version(db, "categories")
+    bump_version(db, "catalog")  # Also rebuilds the popular list, which holds whole product rows
+
+POPULAR_PRODUCTS_LIMIT = 10
+
+def _load_popular_products(db: Session):
+    """Best sellers by decayed score, topped up with the newest products while sales are thin"""
+    products = db.query(Product)\
+        .join(ProductPopularity)\
+        .filter(Product.availability == True, ProductPopularity.score > 0)\
+        .order_by(ProductPopularity.score.desc(), Product.id)\
+        .limit(POPULAR_PRODUCTS_LIMIT)\
+        .all()
+    if len(products) < POPULAR_PRODUCTS_LIMIT:
+        products += db.query(Product)\
+            .filter(Product.availability == True, Product.id.notin_([p.id for p in products]))\
+            .order_by(Product.created_at.desc(), Product.id.desc())\
+            .limit(POPULAR_PRODUCTS_LIMIT - len(products))\
+            .all()
+    return [transform_product(p) for p in products]
+
+# Rebuilt on product writes, and every POPULAR_PRODUCTS_CACHE_SECONDS to take in new sales
+popular_products_cache = VersionedCache("catalog", _load_popular_products, ttl=settings.POPULAR_PRODUCTS_CACHE_SECONDS)
+
+# Each order matches an (availability, key, id) index on products; id keeps pages stable on ties
+PRODUCT_SORT_ORDERS = {
+    ProductSort.NEWEST: (Product.created_at.desc(), Product.id.desc()),
+    ProductSort.PRICE_ASC: (Product.price.asc(), Product.id.asc()),
+    ProductSort.PRICE_DESC: (Product.price.desc(), Product.id.desc()),
+    ProductSort.DISCOUNT: (Product.discount_percentage.desc(), Product.id.desc()),
+    ProductSort.NAME: (Product.name.asc(), Product.id.asc()),
+}
+
+def store_products_query(
+    db: Session,
+    category_filters: PyList[str] = (),
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    in_stock: bool = False,
+    discounted_only: bool = False,
+    slug: Optional[str] = None,
+):
+    """Available products matching the store filters, before title search, sorting and paging"""
+    query = db.query(Product).filter(Product.availability == True)
+    
+    # Filter by categories (IDs or slugs) including all of their subcategories
+    if category_filters:
+        query = query.filter(category_subtree_filter(*category_filters))
+    
+    # Price range and flags
+    if min_price is not None:
+        query = query.filter(Product.price >= min_price)
+    if max_price is not None:
+        query = query.filter(Product.price <= max_price)
+    if in_stock:
+        query = query.filter(Product.stock_quantity > 0)
+    if discounted_only:
+        # Same test as discountedProducts and category_stats.discounted_count
+        query = query.filter(Product.discounted_price > 0)
+    
+    # Filter by slug if provided
+    if slug and slug != "":
+        query = query.filter(Product.slug == slug)
+    return query
+
 class ProductResponse(BaseModel):
     popularProducts: PyList[ProductSchema] = []
     discountedProducts: PyList[ProductSchema] = []
@@ -48,8 +130,11 @@ class ProductResponse(BaseModel):
 def create_product(product: ProductCreate, db: Session = Depends(get_db)):
     db_product = Product(**product.model_dump())
     db.add(db_product)
+    _catalog_changed(db, new_state=product_stats_state(db_product))
+    log_product_changes(db, [db_product.id])
     db.commit()
     db.refresh(db_product)
+    index_product(db, db_product)
     # Transform product to include image array
     return transform_product(db_product)
 
@@ -59,48 +144,49 @@ def read_products(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)
     # Transform products to include image array
     return [transform_product(p) for p in products]
 
+def _ranked_products(query, product_ids):
+    """Load products by ID through query, keeping the order of product_ids"""
+    if not product_ids:
+        return []
+    found = {p.id: p for p in query.filter(Product.id.in_(product_ids)).all()}
+    return [found[product_id] for product_id in product_ids if product_id in found]
+
 @router.get("/store")
+@single_flight()
 def get_store_products(
     category: Optional[str] = Query(None, description="Category ID or slug"),
+    categories: Optional[PyList[str]] = Query(None, description="Several category IDs or slugs, repeated or comma-separated"),
     title: Optional[str] = Query(None, description="Search by product title"),
     slug: Optional[str] = Query(None, description="Search by product slug"),
+    min_price: Optional[float] = Query(None, ge=0, description="Minimum price"),
+    max_price: Optional[float] = Query(None, ge=0, description="Maximum price"),
+    in_stock: bool = Query(False, description="Only products with stock left"),
+    discounted_only: bool = Query(False, description="Only discounted products"),
+    sort: ProductSort = Query(ProductSort.NEWEST, description="Sort order"),
     skip: int = 0, 
     limit: int = 50,
     db: Session = Depends(get_db)
 ):
     """Get products for store display with filtering options"""
-    query = db.query(Product).filter(Product.availability == True)
+    category_filters = [category] if category else []
+    for value in categories or []:
+        category_filters.extend(part.strip() for part in value.split(",") if part.strip())
+    query = store_products_query(db, category_filters, min_price, max_price, in_stock, discounted_only, slug)
     
-    # Filter by category if provided
-    if category and category != "":
-        # Check if category parameter is numeric (ID) or string (slug)
-        try:
-            category_id = int(category)
-            query = query.filter(Product.category_id == category_id)
-        except ValueError:
-            # If not numeric, treat as slug
-            category_obj = db.query(Category).filter(Category.slug == category).first()
-            if category_obj:
-                query = query.filter(Product.category_id == category_obj.id)
-    
-    # Filter by title if provided
+    # Filter by title if provided, falling back to typo-tolerant matching when nothing matches
     if title and title != "":
         search = f"%{title}%"
-        query = query.filter(Product.name.ilike(search))
-    
-    # Filter by slug if provided
-    if slug and slug != "":
-        query = query.filter(Product.slug == slug)
+        filtered_products = query.filter(Product.name.ilike(search))\
+            .order_by(*PRODUCT_SORT_ORDERS[sort]).offset(skip).limit(limit).all()
+        if not filtered_products and skip == 0:
+            # The best `limit` typo-tolerant matches that pass the filters, listed in the requested sort order
+            matches = fuzzy_product_ids(db, title, limit, base=query)
+            filtered_products = query.filter(Product.id.in_(matches)).order_by(*PRODUCT_SORT_ORDERS[sort]).all() if matches else []
+    else:
+        filtered_products = query.order_by(*PRODUCT_SORT_ORDERS[sort]).offset(skip).limit(limit).all()
     
-    # Get the filtered products
-    filtered_products = query.order_by(Product.created_at.desc()).offset(skip).limit(limit).all()
-    
-    # Get popular products (most recent)
-    popular_products = db.query(Product)\
-        .filter(Product.availability == True)\
-        .order_by(Product.created_at.desc())\
-        .limit(10)\
-        .all()
+    # Get popular products (best sellers, from cache)
+    popular_products_transformed = popular_products_cache.get(db).data
     
     # Get discounted products
     discounted_products = db.query(Product)\
@@ -110,7 +196,6 @@ def get_store_products(
         .all()
     
     # Transform all products to include the image array
-    popular_products_transformed = [transform_product(p) for p in popular_products]
     discounted_products_transformed = [transform_product(p) for p in discounted_products]
     filtered_products_transformed = [transform_product(p) for p in filtered_products]
     
@@ -122,6 +207,7 @@ def get_store_products(
     }
 
 @router.get("/show")
+@single_flight()
 def get_showing_products(db: Session = Depends(get_db), limit: int = 10):
     """Get products for display on home page or featured sections"""
     products = db.query(Product)\
@@ -133,6 +219,7 @@ def get_showing_products(db: Session = Depends(get_db), limit: int = 10):
     return [transform_product(p) for p in products]
 
 @router.get("/discount")
+@single_flight()
 def get_discounted_products(db: Session = Depends(get_db), limit: int = 10):
     """Get products with discount"""
     products = db.query(Product)\
@@ -143,7 +230,95 @@ def get_discounted_products(db: Session = Depends(get_db), limit: int = 10):
     # Transform products to include image array
     return [transform_product(p) for p in products]
 
+@router.get("/search")
+def search_products(
+    q: str = Query(..., min_length=1, max_length=100, description="Search text, typos allowed"),
+    limit: int = Query(20, ge=1, le=50),
+    db: Session = Depends(get_db)
+):
+    """Typo-tolerant product search ranked by similarity, then popularity"""
+    base = db.query(Product).filter(Product.availability == True)
+    products = _ranked_products(base, fuzzy_product_ids(db, q, limit, base))
+    return {"query": q, "products": [transform_product(p) for p in products]}
+
+@router.get("/suggest")
+def suggest_products(
+    q: str = Query(..., min_length=1, description="What the shopper has typed so far"),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db)
+):
+    """Autocomplete suggestions for product and category names, most popular first"""
+    ensure_search_index(db)
+    return {"query": q, "suggestions": suggest_index.suggest(q, limit)}
+
+@router.get("/changes")
+def get_product_changes(
+    since: int = Query(0, ge=0, description="Cursor from the previous response; 0 for a full sync"),
+    limit: int = Query(500, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """Products created, updated or deleted after the cursor, in change order"""
+    changes, cursor, has_more = read_product_changes(db, since, limit)
+    return {
+        "since": since,
+        "next": cursor,
+        "has_more": has_more,
+        "changes": [
+            {"seq": change["seq"], "id": change["id"], "deleted": change["deleted"],
+             "product": transform_product(change["product"]) if change["product"] else None}
+            for change in changes
+        ],
+    }
+
+def _parse_product_ids(ids: str) -> PyList[int]:
+    try:
+        product_ids = list(dict.fromkeys(int(part) for part in ids.split(",") if part.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated product IDs")
+    if not product_ids or len(product_ids) > settings.STREAM_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"Follow between 1 and {settings.STREAM_MAX_IDS} products")
+    return product_ids
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+@router.get("/stream")
+async def stream_products(request: Request, ids: str = Query(..., description="Comma-separated product IDs to follow")):
+    """Server-Sent Events with the current and then every new price and stock of the given products"""
+    product_ids = _parse_product_ids(ids)
+    # Subscribe before reading current state so nothing committed in between is missed
+    subscription = product_events.subscribe(product_ids)
+    
+    def current_states():
+        db = SessionLocal()
+        try:
+            publish_product_changes(db, product_ids)
+        finally:
+            db.close()
+    
+    async def events():
+        try:
+            await run_in_threadpool(current_states)
+            while True:
+                try:
+                    state = await asyncio.wait_for(subscription.queue.get(), settings.STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                if subscription.overflowed:
+                    yield _sse("reset", {})
+                    break
+                yield _sse("product", state)
+        finally:
+            product_events.unsubscribe(subscription)
+    
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @router.get("/{product_id_or_slug}")
+@single_flight()
 def read_product(product_id_or_slug: str, db: Session = Depends(get_db)):
     # Try to parse as integer (ID)
     try:
@@ -158,18 +333,36 @@ def read_product(product_id_or_slug: str, db: Session = Depends(get_db)):
     # Transform product to include image array
     return transform_product(db_product)
 
+@router.get("/{product_id}/related")
+def get_related_products(product_id: int, limit: int = Query(10, ge=1, le=20), db: Session = Depends(get_db)):
+    """Products most often bought together with this one, precomputed by build_related_products.py"""
+    products = db.query(Product)\
+        .join(ProductRelated, ProductRelated.related_id == Product.id)\
+        .filter(ProductRelated.product_id == product_id, Product.availability == True)\
+        .order_by(ProductRelated.score.desc(), ProductRelated.related_id)\
+        .limit(limit)\
+        .all()
+    if not products and db.query(Product.id).filter(Product.id == product_id).first() is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return [transform_product(p) for p in products]
+
 @router.put("/{product_id}")
 def update_product(product_id: int, product: ProductUpdate, db: Session = Depends(get_db)):
     db_product = db.query(Product).filter(Product.id == product_id).first()
     if db_product is None:
         raise HTTPException(status_code=404, detail="Product not found")
         
+    old_state = product_stats_state(db_product)
     update_data = product.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_product, key, value)
-            
+    
+    _catalog_changed(db, old_state, product_stats_state(db_product))
+    log_product_changes(db, [product_id])
     db.commit()
     db.refresh(db_product)
+    index_product(db, db_product)
+    publish_product_changes(db, [product_id])
     # Transform product to include image array
     return transform_product(db_product)
 
@@ -179,6 +372,11 @@ def delete_product(product_id: int, db: Session = Depends(get_db)):
     if db_product is None:
         raise HTTPException(status_code=404, detail="Product not found")
         
+    old_state = product_stats_state(db_product)
     db.delete(db_product)
+    _catalog_changed(db, old_state)
+    log_product_changes(db, [product_id], deleted=True)
     db.commit()
+    unindex_product(db, product_id)
+    publish_product_changes(db, [product_id])
     return None
@@ -36,3 +36,16 @@ class Category(CategoryBase):
 
     class Config:
         from_attributes = True
+
+class CategoryStats(BaseModel):
+    product_count: int = 0
+    available_count: int = 0
+    discounted_count: int = 0
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+
+    class Config:
+        from_attributes = True
+
+class CategoryWithStats(Category):
+    stats: Optional[CategoryStats] = None
@@ -1,8 +1,16 @@
 from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
+from enum import Enum
 from schemas.category import Category
 
+class ProductSort(str, Enum):
+    NEWEST = "newest"
+    PRICE_ASC = "price_asc"
+    PRICE_DESC = "price_desc"
+    DISCOUNT = "discount"
+    NAME = "name"
+
 class ProductBase(BaseModel):
     name: str
     slug: str
@@ -5,7 +5,9 @@ from sqlalchemy.orm import sessionmaker
 
 from database.database import Base, get_db
 from core.config import settings
+from core.security import create_access_token
 from main import app
+from models.user import User
 
 # Create a test database URL - this is just used for connection
 # but we won't actually create test-specific tables
@@ -33,8 +35,9 @@ def db_session():
     # Begin a nested transaction that will be rolled back after tests
     transaction = connection.begin()
     
-    # Create a session bound to the connection
-    session = TestingSessionLocal(bind=connection)
+    # Create a session bound to the connection; its commits and rollbacks
+    # (e.g. after an IntegrityError) only release or undo a savepoint
+    session = TestingSessionLocal(bind=connection, join_transaction_mode="create_savepoint")
     
     try:
         yield session
@@ -64,3 +67,32 @@ def client(db_session):
     
     # Clear the dependency override after the test
     app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def admin_headers(db_session):
+    """
+    Authorization headers of an admin user created inside the test transaction
+    """
+    admin = db_session.query(User).filter(User.email == "test-admin@example.com").first()
+    if admin is None:
+        admin = User(email="test-admin@example.com", username="test-admin",
+                     hashed_password="not-used", is_admin=True)
+        db_session.add(admin)
+        db_session.commit()
+    token = create_access_token(data={"sub": str(admin.id)})
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def make_product(client):
+    """
+    Factory creating products through the API; returns the created product
+    """
+    def make(name: str, **fields):
+        data = {"name": name, "slug": name.lower().replace(" ", "-"), "price": 9.99, "stock_quantity": 10}
+        data.update(fields)
+        response = client.post("/products/", json=data)
+        assert response.status_code == 201
+        return response.json()
+    return make
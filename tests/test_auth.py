@@ -0,0 +1,92 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from core import security
+from core.security import PasswordHasherPool, TokenCache
+from routers.auth import _registration_conflict
+from schemas.user import UserCreate
+
+
+def test_register_and_login_case_insensitive(client: TestClient, db_session: Session):
+    """Test that logins ignore the case of the email or username."""
+    response = client.post("/auth/register", json={
+        "email": "Case.Tester@example.com",
+        "username": "CaseTester",
+        "password": "secret-password"
+    })
+    assert response.status_code == 201
+
+    response = client.post("/auth/login", json={"email": "case.tester@EXAMPLE.com", "password": "secret-password"})
+    assert response.status_code == 200
+    assert response.json()["user"]["username"] == "CaseTester"
+
+    response = client.post("/auth/token", data={"username": "casetester", "password": "secret-password"})
+    assert response.status_code == 200
+    assert response.json()["access_token"]
+
+    response = client.post("/auth/login", json={"email": "case.tester@example.com", "password": "wrong-password"})
+    assert response.status_code == 401
+
+
+def test_register_duplicate_ignores_case(client: TestClient, db_session: Session):
+    """Test that an email differing only in case is reported as already registered."""
+    response = client.post("/auth/register", json={
+        "email": "dupe@example.com",
+        "username": "dupe-one",
+        "password": "secret-password"
+    })
+    assert response.status_code == 201
+
+    response = client.post("/auth/register", json={
+        "email": "DUPE@example.com",
+        "username": "dupe-two",
+        "password": "secret-password"
+    })
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Email already registered"
+
+    response = client.post("/auth/register", json={
+        "email": "dupe-two@example.com",
+        "username": "DUPE-ONE",
+        "password": "secret-password"
+    })
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Username already registered"
+
+    # Any other integrity failure isn't blamed on the username
+    fresh = UserCreate(email="fresh@example.com", username="fresh", password="secret-password")
+    assert _registration_conflict(db_session, fresh) is None
+
+
+def test_password_pool_rejects_when_full(client: TestClient, db_session: Session, monkeypatch):
+    """Test that hashing beyond the pool's pending limit answers 503 instead of queueing."""
+    full_pool = PasswordHasherPool(workers=1, max_pending=0)
+    monkeypatch.setattr(security, "password_pool", full_pool)
+
+    response = client.post("/auth/register", json={
+        "email": "busy@example.com",
+        "username": "busy",
+        "password": "secret-password"
+    })
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert full_pool.stats()["rejected"] == 1
+
+
+def test_token_cache_drops_expired_tokens():
+    """Test that a cached token is only served until its exp claim passes."""
+    cache = TokenCache(maxsize=2)
+    cache.put("live", {"sub": "1", "exp": time.time() + 60})
+    cache.put("expired", {"sub": "2", "exp": time.time() - 1})
+
+    assert cache.get("live") == {"sub": "1", "exp": pytest.approx(time.time() + 60, abs=5)}
+    assert cache.get("expired") is None
+
+    # Least recently used entries are evicted beyond maxsize
+    cache.put("a", {"sub": "3", "exp": time.time() + 60})
+    cache.put("b", {"sub": "4", "exp": time.time() + 60})
+    assert cache.get("live") is None
+    assert cache.get("b") is not None
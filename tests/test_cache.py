@@ -0,0 +1,124 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from core.cache import request_key, single_flight
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_request_key_ignores_non_plain_arguments():
+    """Test that sessions and other objects don't split the key, while query values do."""
+    session = object()
+    assert request_key("fruit", session, limit=10, db=session) == ("fruit", ("limit", 10))
+    assert request_key(category=None, ids=[1, 2]) == (("category", None), ("ids", (1, 2)))
+    assert request_key(ids=[1, object()]) == ()
+    assert request_key(limit=10, page=2) == request_key(page=2, limit=10)
+
+
+def test_single_flight_shares_one_call():
+    """Test that concurrent calls with the same key compute once, and other keys don't wait."""
+    release = threading.Event()
+    calls = []
+
+    @single_flight(stale_seconds=0)
+    def load(category, db=None):
+        calls.append(category)
+        release.wait(2)
+        return {"category": category}
+
+    flight = load.single_flight
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        futures = [pool.submit(load, "fruit", db=object()) for _ in range(4)]
+        wait_for(lambda: flight.shared == 3)
+        release.set()
+        results = [future.result(2) for future in futures]
+        other = pool.submit(load, "bread").result(2)
+
+    assert results == [{"category": "fruit"}] * 4
+    assert all(result is results[0] for result in results)
+    assert other == {"category": "bread"}
+    assert calls == ["fruit", "bread"]
+    assert (flight.computed, flight.shared, flight.stale) == (2, 3, 0)
+
+    # Nothing is kept once the call is over
+    load("fruit")
+    assert flight.computed == 3
+
+
+def test_single_flight_shares_errors():
+    """Test that waiting callers get the leader's exception, and the next call retries."""
+    release = threading.Event()
+    calls = []
+
+    @single_flight(stale_seconds=0)
+    def load(category):
+        calls.append(category)
+        release.wait(2)
+        raise LookupError(category)
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(load, "fruit") for _ in range(3)]
+        wait_for(lambda: load.single_flight.shared == 2)
+        release.set()
+        for future in futures:
+            with pytest.raises(LookupError):
+                future.result(2)
+    assert calls == ["fruit"]
+
+    with pytest.raises(LookupError):
+        load("fruit")
+    assert calls == ["fruit", "fruit"]
+
+
+def test_single_flight_serves_stale_while_recomputing():
+    """Test that callers during a recompute get the previous result when it is recent enough."""
+    release = threading.Event()
+    results = iter(["first", "second"])
+
+    @single_flight(stale_seconds=60)
+    def load():
+        release.wait(2)
+        return next(results)
+
+    release.set()
+    assert load() == "first"
+    release.clear()
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        leader = pool.submit(load)
+        wait_for(lambda: load.single_flight.computed == 2)
+        assert load() == "first"
+        release.set()
+        assert leader.result(2) == "second"
+    assert load.single_flight.stale == 1
+
+
+def test_single_flight_async():
+    """Test that coroutine functions share one call and its errors too."""
+    calls = []
+
+    @single_flight(stale_seconds=0)
+    async def load(category):
+        calls.append(category)
+        await asyncio.sleep(0.01)
+        if category == "broken":
+            raise LookupError(category)
+        return [category]
+
+    async def scenario():
+        results = await asyncio.gather(*(load("fruit") for _ in range(5)))
+        assert results == [["fruit"]] * 5
+        errors = await asyncio.gather(*(load("broken") for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(error, LookupError) for error in errors)
+
+    asyncio.run(scenario())
+    assert calls == ["fruit", "broken"]
+    assert (load.single_flight.computed, load.single_flight.shared) == (2, 6)
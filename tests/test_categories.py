@@ -0,0 +1,129 @@
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from core.category_stats import apply_product_stats_change, product_stats_state, refresh_category_stats
+from models.category import Category
+from models.product import Product
+
+
+def create_category(client: TestClient, headers, slug: str, parent_id=None) -> int:
+    response = client.post("/category/", json={"name": slug.title(), "slug": slug, "parent_id": parent_id},
+                           headers=headers)
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def test_move_category_rewrites_subtree_paths(client: TestClient, db_session: Session, admin_headers):
+    """Test that re-parenting a category moves its whole subtree."""
+    fruit = create_category(client, admin_headers, "move-fruit")
+    citrus = create_category(client, admin_headers, "move-citrus", fruit)
+    lemons = create_category(client, admin_headers, "move-lemons", citrus)
+    produce = create_category(client, admin_headers, "move-produce")
+
+    lemon = db_session.get(Category, lemons)
+    assert (lemon.path, lemon.depth) == (f"/{fruit}/{citrus}/{lemons}/", 2)
+
+    response = client.put(f"/category/{citrus}", json={"parent_id": produce}, headers=admin_headers)
+    assert response.status_code == 200
+    db_session.expire_all()
+    lemon = db_session.get(Category, lemons)
+    assert (lemon.path, lemon.depth) == (f"/{produce}/{citrus}/{lemons}/", 2)
+
+    # Moving to the top level shortens every descendant's path
+    response = client.put(f"/category/{citrus}", json={"parent_id": None}, headers=admin_headers)
+    assert response.status_code == 200
+    db_session.expire_all()
+    lemon = db_session.get(Category, lemons)
+    assert (lemon.path, lemon.depth) == (f"/{citrus}/{lemons}/", 1)
+
+
+def test_move_category_rejects_cycles(client: TestClient, db_session: Session, admin_headers):
+    """Test that a category can't become its own ancestor."""
+    dairy = create_category(client, admin_headers, "cycle-dairy")
+    cheese = create_category(client, admin_headers, "cycle-cheese", dairy)
+    cheddar = create_category(client, admin_headers, "cycle-cheddar", cheese)
+
+    for parent_id in (dairy, cheese, cheddar):
+        response = client.put(f"/category/{dairy}", json={"parent_id": parent_id}, headers=admin_headers)
+        assert response.status_code == 400
+
+    db_session.expire_all()
+    assert db_session.get(Category, dairy).path == f"/{dairy}/"
+
+
+def category_stats(client: TestClient, db_session: Session, category_id: int):
+    # Requests share the test session; forget the stats rows it loaded before the last write
+    db_session.expire_all()
+    categories = {category["id"]: category for category in client.get("/category/").json()}
+    return categories[category_id]["stats"]
+
+
+def test_category_stats_follow_product_writes(client: TestClient, db_session: Session, admin_headers, make_product):
+    """Test that subtree counts and price ranges stay current as products change."""
+    bakery = create_category(client, admin_headers, "stats-bakery")
+    bread = create_category(client, admin_headers, "stats-bread", bakery)
+    assert category_stats(client, db_session, bakery)["product_count"] == 0
+
+    make_product("Stats Rye", price=3.5, category_id=bread)
+    baguette = make_product("Stats Baguette", price=2.0, discounted_price=1.5, category_id=bread)
+    make_product("Stats Stale Loaf", price=1.0, availability=False, category_id=bread)
+
+    stats = category_stats(client, db_session, bakery)
+    assert stats == {"product_count": 3, "available_count": 2, "discounted_count": 1,
+                     "min_price": 2.0, "max_price": 3.5}
+    assert category_stats(client, db_session, bread) == stats
+
+    response = client.put(f"/products/{baguette['id']}", json={"price": 5.0})
+    assert response.status_code == 200
+    assert category_stats(client, db_session, bakery)["max_price"] == 5.0
+
+    response = client.delete(f"/products/{baguette['id']}")
+    assert response.status_code == 204
+    stats = category_stats(client, db_session, bakery)
+    assert (stats["product_count"], stats["discounted_count"], stats["max_price"]) == (2, 0, 3.5)
+
+
+
+def test_category_stats_deltas_match_full_recompute(client: TestClient, db_session: Session, admin_headers, make_product):
+    """Test that incremental stats agree with a full recompute, including when a boundary price goes away."""
+    pantry = create_category(client, admin_headers, "delta-pantry")
+    oils = create_category(client, admin_headers, "delta-oils", pantry)
+    spices = create_category(client, admin_headers, "delta-spices", pantry)
+
+    olive = make_product("Delta Olive Oil", price=12.0, category_id=oils)["id"]
+    sesame = make_product("Delta Sesame Oil", price=4.0, discounted_price=3.0, category_id=oils)["id"]
+    saffron = make_product("Delta Saffron", price=20.0, category_id=spices)["id"]
+    make_product("Delta Pepper", price=4.0, category_id=spices)
+    assert category_stats(client, db_session, pantry)["max_price"] == 20.0
+
+    def write(product_id, **fields):
+        # The API only edits some fields; the others change through the ORM, as an import would
+        product = db_session.get(Product, product_id)
+        old_state = product_stats_state(product)
+        for key, value in fields.items():
+            setattr(product, key, value)
+        db_session.flush()
+        apply_product_stats_change(db_session, old_state, product_stats_state(product))
+
+    def check():
+        incremental = {category_id: category_stats(client, db_session, category_id) for category_id in (pantry, oils, spices)}
+        refresh_category_stats(db_session, [oils, spices])
+        assert {category_id: category_stats(client, db_session, category_id)
+                for category_id in (pantry, oils, spices)} == incremental
+        return incremental
+
+    # The pantry's maximum drops to the next price down
+    assert client.put(f"/products/{saffron}", json={"price": 8.0}).status_code == 200
+    assert check()[pantry]["max_price"] == 12.0
+    # The sesame oil shares the minimum price with the pepper, so the pantry keeps it
+    write(sesame, availability=False)
+    stats = check()
+    assert (stats[pantry]["min_price"], stats[oils]["min_price"], stats[pantry]["discounted_count"]) == (4.0, 12.0, 0)
+    write(olive, category_id=spices, discounted_price=10.0)
+    assert check()[oils] == {"product_count": 1, "available_count": 0, "discounted_count": 0,
+                             "min_price": None, "max_price": None}
+    write(sesame, availability=True, price=2.0)
+    assert check()[pantry]["min_price"] == 2.0
+    assert client.delete(f"/products/{sesame}").status_code == 204
+    assert check()[pantry] == {"product_count": 3, "available_count": 3, "discounted_count": 1,
+                               "min_price": 4.0, "max_price": 12.0}
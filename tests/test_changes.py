@@ -0,0 +1,82 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from core.changes import assign_change_sequence
+from models.product import ProductChange
+
+
+def read_all_changes(client: TestClient, db_session: Session, since: int):
+    # What the sequencer task does in the background
+    assign_change_sequence(db_session)
+    changes = []
+    while True:
+        response = client.get("/products/changes", params={"since": since, "limit": 1000})
+        assert response.status_code == 200
+        page = response.json()
+        changes += page["changes"]
+        since = page["next"]
+        if not page["has_more"]:
+            return changes, since
+
+
+def test_change_feed_cursor_and_tombstones(client: TestClient, db_session: Session, make_product):
+    """Test that the feed returns each changed product once, deleted ones as tombstones."""
+    _, cursor = read_all_changes(client, db_session, 0)
+
+    kept = make_product("Feed Kept", price=2.0)
+    gone = make_product("Feed Gone", price=3.0)
+    assert client.put(f"/products/{kept['id']}", json={"price": 2.5}).status_code == 200
+    assert client.delete(f"/products/{gone['id']}").status_code == 204
+
+    changes, next_cursor = read_all_changes(client, db_session, cursor)
+    assert [(change["id"], change["deleted"]) for change in changes] == [(kept["id"], False), (gone["id"], True)]
+    assert changes[0]["product"]["price"] == 2.5
+    assert changes[1]["product"] is None
+    assert next_cursor > cursor
+
+    # Nothing new: the cursor stays put
+    assert read_all_changes(client, db_session, next_cursor) == ([], next_cursor)
+
+
+def test_change_feed_reads_never_write(client: TestClient, db_session: Session, make_product):
+    """Test that reading the feed leaves numbering to the sequencer."""
+    _, cursor = read_all_changes(client, db_session, 0)
+    product = make_product("Feed Unnumbered", price=1.0)
+
+    response = client.get("/products/changes", params={"since": cursor})
+    assert response.json()["changes"] == []
+    assert db_session.query(ProductChange).filter(ProductChange.seq.is_(None)).count() == 1
+
+    changes, _ = read_all_changes(client, db_session, cursor)
+    assert [change["id"] for change in changes] == [product["id"]]
+
+
+def test_change_feed_tombstones_category_products(client: TestClient, db_session: Session, admin_headers, make_product):
+    """Test that products deleted along with their category show up as tombstones."""
+    response = client.post("/category/", json={"name": "Feed Aisle", "slug": "feed-aisle"}, headers=admin_headers)
+    category_id = response.json()["id"]
+    products = [make_product(f"Feed Aisle Item {i}", category_id=category_id)["id"] for i in range(2)]
+    _, cursor = read_all_changes(client, db_session, 0)
+
+    assert client.delete(f"/category/{category_id}", headers=admin_headers).status_code == 204
+    changes, _ = read_all_changes(client, db_session, cursor)
+    assert [(change["id"], change["deleted"]) for change in changes] == [(product_id, True) for product_id in products]
+
+
+def test_change_feed_numbers_entries_in_commit_order(client: TestClient, db_session: Session, make_product):
+    """Test that an entry committed after a read is delivered even though it was inserted with a lower id."""
+    product = make_product("Feed Late", price=4.0)
+    _, cursor = read_all_changes(client, db_session, 0)
+    last_id = db_session.query(func.max(ProductChange.id)).scalar()
+
+    # The transaction that inserted first commits last
+    db_session.add(ProductChange(id=last_id + 10, product_id=product["id"], deleted=False))
+    db_session.commit()
+    changes, cursor = read_all_changes(client, db_session, cursor)
+    assert [change["id"] for change in changes] == [product["id"]]
+
+    db_session.add(ProductChange(id=last_id + 5, product_id=product["id"], deleted=False))
+    db_session.commit()
+    changes, _ = read_all_changes(client, db_session, cursor)
+    assert [change["id"] for change in changes] == [product["id"]]
@@ -0,0 +1,67 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from core import compression
+from core.compression import accepted_encoding
+from core.config import settings
+from database.seed import seed_languages
+
+
+def test_accepted_encoding_negotiation():
+    """Test Accept-Encoding parsing, q-values included."""
+    assert accepted_encoding(None) is None
+    assert accepted_encoding("identity") is None
+    assert accepted_encoding("gzip, deflate") == "gzip"
+    assert accepted_encoding("GZIP;q=0.5") == "gzip"
+    assert accepted_encoding("gzip;q=0") is None
+    assert accepted_encoding("*;q=0.1, gzip;q=0") == ("br" if compression.brotli else None)
+    if compression.brotli:
+        assert accepted_encoding("gzip, br") == "br"
+        assert accepted_encoding("gzip;q=1, br;q=0.5") == "gzip"
+
+
+def test_responses_compressed_when_large_enough(client: TestClient, db_session: Session, make_product):
+    """Test that large JSON responses are gzipped with a weak ETag and small ones pass through."""
+    for i in range(10):
+        make_product(f"Compressed Product {i}", description="Crisp and fresh " * 10)
+
+    response = client.get("/products/", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert len(response.json()) >= 10
+
+    response = client.get("/products/", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+
+    response = client.get("/products/discount?limit=0", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+
+def test_cached_snapshots_served_precompressed(client: TestClient, db_session: Session, monkeypatch):
+    """Test that cached bodies get one ETag per encoding and revalidate within it."""
+    monkeypatch.setattr(settings, "CACHE_VERSION_CHECK_SECONDS", 0)
+    monkeypatch.setattr(settings, "COMPRESSION_MIN_SIZE", 1)
+    seed_languages(db_session)
+    db_session.commit()
+
+    plain = client.get("/language/show", headers={"Accept-Encoding": "identity"})
+    zipped = client.get("/language/show", headers={"Accept-Encoding": "gzip"})
+    assert zipped.headers["content-encoding"] == "gzip"
+    assert zipped.headers["etag"] == plain.headers["etag"][:-1] + '-gzip"'
+    assert zipped.json() == plain.json()
+
+    response = client.get("/language/show", headers={"Accept-Encoding": "gzip", "If-None-Match": zipped.headers["etag"]})
+    assert response.status_code == 304
+    # The identity ETag doesn't validate the gzip representation
+    response = client.get("/language/show", headers={"Accept-Encoding": "gzip", "If-None-Match": plain.headers["etag"]})
+    assert response.status_code == 200
+
+
+@pytest.mark.skipif(compression.brotli is None, reason="brotli not installed")
+def test_brotli_preferred_when_accepted(client: TestClient, db_session: Session, monkeypatch):
+    """Test that br wins over gzip when the client accepts both."""
+    monkeypatch.setattr(settings, "COMPRESSION_MIN_SIZE", 1)
+    response = client.get("/language/show", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["content-encoding"] == "br"
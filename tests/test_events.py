@@ -0,0 +1,110 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from core import events
+from core.changes import assign_change_sequence
+from core.config import settings
+from core.events import ProductEventHub
+from models.product import ProductChange
+
+
+async def next_event(subscription):
+    return await asyncio.wait_for(subscription.queue.get(), 1)
+
+
+def quiet_hub():
+    hub = ProductEventHub()
+    hub._poll_changes = lambda: asyncio.sleep(0)  # Only local publishes in these tests
+    return hub
+
+
+def test_event_hub_fans_out_to_followers():
+    """Test that a publish reaches exactly the subscriptions following that product, once."""
+    async def scenario():
+        hub = quiet_hub()
+        apples = hub.subscribe([1, 2])
+        pears = hub.subscribe([2, 3])
+        assert hub.watching([1, 2, 3, 4]) == [1, 2, 3]
+        assert hub.subscriber_count() == 2
+
+        # Request threads publish after their commit
+        state = {"id": 2, "price": 1.5, "stock_quantity": 7}
+        await asyncio.to_thread(hub.publish, [state])
+        assert await next_event(apples) == state
+        assert await next_event(pears) == state
+
+        # The same state again (e.g. from the change feed) isn't repeated
+        await asyncio.to_thread(hub.publish, [state, {"id": 1, "price": 2.0}])
+        assert await next_event(apples) == {"id": 1, "price": 2.0}
+        await asyncio.sleep(0)
+        assert pears.queue.empty()
+
+        hub.unsubscribe(apples)
+        hub.unsubscribe(pears)
+        assert hub.watching([1, 2, 3]) == []
+
+    asyncio.run(scenario())
+
+
+def test_event_hub_flags_slow_subscribers(monkeypatch):
+    """Test that a subscriber whose queue is full is flagged for a reset instead of buffering."""
+    monkeypatch.setattr(settings, "STREAM_QUEUE_SIZE", 1)
+
+    async def scenario():
+        hub = quiet_hub()
+        subscription = hub.subscribe([1])
+        await asyncio.to_thread(hub.publish, [{"id": 1, "price": 1.0}, {"id": 1, "price": 2.0}])
+        assert await next_event(subscription) == {"id": 1, "price": 1.0}
+        assert subscription.overflowed
+
+    asyncio.run(scenario())
+
+
+def test_stream_rejects_bad_ids(client: TestClient):
+    """Test that the stream validates the products it is asked to follow."""
+    assert client.get("/products/stream", params={"ids": "1,abc"}).status_code == 400
+    too_many = ",".join(str(i) for i in range(settings.STREAM_MAX_IDS + 1))
+    assert client.get("/products/stream", params={"ids": too_many}).status_code == 400
+
+
+def test_event_hub_poll_only_reads(db_session: Session, make_product, monkeypatch):
+    """Test that polling the feed for other workers' writes leaves numbering to the sequencer."""
+    monkeypatch.setattr(events, "SessionLocal", lambda: db_session)
+    monkeypatch.setattr(db_session, "close", lambda: None)
+    assign_change_sequence(db_session)
+    cursor = events.ProductEventHub._latest_seq()
+    product = make_product("Polled Plum", price=1.0)
+
+    async def scenario():
+        hub = quiet_hub()
+        hub.subscribe([product["id"]])
+        assert hub._read_changes(cursor) == (cursor, [])
+        assert db_session.query(ProductChange).filter(ProductChange.seq.is_(None)).count() == 1
+
+        assign_change_sequence(db_session)
+        next_cursor, states = hub._read_changes(cursor)
+        assert next_cursor > cursor
+        assert [state["id"] for state in states] == [product["id"]]
+
+    asyncio.run(scenario())
+
+
+def test_category_delete_publishes_its_products(client: TestClient, db_session: Session, admin_headers, make_product, monkeypatch):
+    """Test that products deleted with their category reach subscribers and leave the search index."""
+    published = []
+    monkeypatch.setattr(events.product_events, "watching", lambda product_ids: list(product_ids))
+    monkeypatch.setattr(events.product_events, "publish", published.extend)
+    category_id = client.post("/category/", json={"name": "Stream Aisle", "slug": "stream-aisle"},
+                              headers=admin_headers).json()["id"]
+    product = make_product("Streamed Quark", category_id=category_id)
+
+    def suggested():
+        suggestions = client.get("/products/suggest", params={"q": "streamed"}).json()["suggestions"]
+        return product["id"] in [entry["id"] for entry in suggestions if entry["type"] == "product"]
+
+    assert suggested()
+    assert client.delete(f"/category/{category_id}", headers=admin_headers).status_code == 204
+    assert published == [{"id": product["id"], "deleted": True}]
+    assert not suggested()
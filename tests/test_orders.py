@@ -0,0 +1,54 @@
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from models.product import ProductPopularity
+from routers.products import popular_products_cache
+
+ADDRESS = {"address": "1 Market St", "city": "Springfield", "state": "IL",
+           "postal_code": "62701", "country": "US", "phone": "555-0100"}
+
+
+def units_sold(db_session: Session, product_id: int):
+    # The upserts bypass the session's identity map
+    db_session.expire_all()
+    popularity = db_session.get(ProductPopularity, product_id)
+    return None if popularity is None else popularity.units_sold
+
+
+def place_order(client: TestClient, headers, *items):
+    response = client.post("/orders/", headers=headers, json={**ADDRESS, "items": [
+        {"product_id": product["id"], "quantity": quantity, "unit_price": product["price"]}
+        for product, quantity in items
+    ]})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def test_popularity_follows_orders_and_cancellations(client: TestClient, db_session: Session, admin_headers, make_product):
+    """Test that orders add to product popularity and cancellations take it back out."""
+    figs = make_product("Popular Figs", price=4.0, stock_quantity=50)
+    dates = make_product("Popular Dates", price=6.0, stock_quantity=50)
+
+    first = place_order(client, admin_headers, (figs, 2), (dates, 1))
+    assert (units_sold(db_session, figs["id"]), units_sold(db_session, dates["id"])) == (2, 1)
+    place_order(client, admin_headers, (figs, 3))
+    assert units_sold(db_session, figs["id"]) == 5
+
+    # The popular list picks up sales once its timer runs out
+    popular_products_cache.invalidate()
+    popular = client.get("/products/store").json()["popularProducts"]
+    assert [product["name"] for product in popular[:2]] == ["Popular Figs", "Popular Dates"]
+
+    response = client.delete(f"/orders/{first}", headers=admin_headers)
+    assert response.status_code == 204
+    assert (units_sold(db_session, figs["id"]), units_sold(db_session, dates["id"])) == (3, 0)
+
+    # Cancelling twice doesn't take the sale back twice
+    response = client.put(f"/orders/{first}", json={"status": "cancelled"}, headers=admin_headers)
+    assert response.status_code == 200
+    assert units_sold(db_session, figs["id"]) == 3
+
+    # Reopening the cancelled order counts its sales again
+    response = client.put(f"/orders/{first}", json={"status": "processing"}, headers=admin_headers)
+    assert response.status_code == 200
+    assert (units_sold(db_session, figs["id"]), units_sold(db_session, dates["id"])) == (5, 1)
@@ -4,6 +4,7 @@ from sqlalchemy.orm import Session
 
 from main import app
 from schemas.product import ProductCreate
+from core.query_stats import assert_query_budget
 
 
 def test_create_product(client: TestClient, db_session: Session):
@@ -64,3 +65,90 @@ def test_read_product(client: TestClient, db_session: Session):
     assert data["price"] == product_data["price"]
     assert data["stock_quantity"] == product_data["stock_quantity"]
     assert data["id"] == product_id
+
+
+def test_store_listing_query_budget(client: TestClient, db_session: Session):
+    """Test that the store listing doesn't run a query per product."""
+    for i in range(15):
+        response = client.post("/products/", json={
+            "name": f"Budget Product {i}",
+            "slug": f"budget-product-{i}",
+            "price": 1.99 + i,
+            "stock_quantity": 10
+        })
+        assert response.status_code == 201
+    
+    # Listing, discounted list, their categories, and the popular list cache
+    with assert_query_budget(10):
+        response = client.get("/products/store?limit=50")
+    assert response.status_code == 200
+    assert len(response.json()["products"]) >= 15
+
+
+def store_names(client: TestClient, **params):
+    response = client.get("/products/store", params=params)
+    assert response.status_code == 200
+    return [product["name"] for product in response.json()["products"]]
+
+
+def test_store_sort_orders(client: TestClient, db_session: Session, make_product):
+    """Test the store sort options and the truncated discount percentage."""
+    half = make_product("SortTest Half", price=4.0, discounted_price=2.0)
+    make_product("SortTest Quarter", price=4.0, discounted_price=3.0)
+    markup = make_product("SortTest Markup", price=2.0, discounted_price=2.01)
+    make_product("SortTest Plain", price=1.0)
+
+    assert half["discount_percentage"] == 50
+    # int() truncates toward zero, so a discounted price just above the price is 0%, not -1%
+    assert markup["discount_percentage"] == 0
+
+    assert store_names(client, title="SortTest", sort="discount") == \
+        ["SortTest Half", "SortTest Quarter", "SortTest Plain", "SortTest Markup"]
+    assert store_names(client, title="SortTest", sort="price_asc") == \
+        ["SortTest Plain", "SortTest Markup", "SortTest Half", "SortTest Quarter"]
+    assert store_names(client, title="SortTest", sort="name") == \
+        ["SortTest Half", "SortTest Markup", "SortTest Plain", "SortTest Quarter"]
+    assert store_names(client, title="SortTest", sort="newest")[0] == "SortTest Plain"
+
+
+def test_store_filters(client: TestClient, db_session: Session, admin_headers, make_product):
+    """Test the price range, stock, discount and multi-category filters."""
+    def category(slug, parent_id=None):
+        response = client.post("/category/", json={"name": slug, "slug": slug, "parent_id": parent_id},
+                               headers=admin_headers)
+        assert response.status_code == 201
+        return response.json()["id"]
+
+    drinks = category("filter-drinks")
+    juice = category("filter-juice", drinks)
+    snacks = category("filter-snacks")
+    make_product("FilterTest Juice", price=3.0, category_id=juice)
+    make_product("FilterTest Chips", price=2.0, stock_quantity=0, category_id=snacks)
+    # Discounted by less than 1%: discounted for every listing, even though the percentage rounds to 0
+    make_product("FilterTest Cola", price=2.0, discounted_price=1.995, category_id=drinks)
+
+    assert store_names(client, title="FilterTest", min_price=2.5) == ["FilterTest Juice"]
+    assert store_names(client, title="FilterTest", max_price=2.0, sort="name") == ["FilterTest Chips", "FilterTest Cola"]
+    assert "FilterTest Chips" not in store_names(client, title="FilterTest", in_stock=True)
+
+    discounted = store_names(client, title="FilterTest", discounted_only=True)
+    assert discounted == ["FilterTest Cola"]
+    response = client.get("/products/store", params={"title": "FilterTest"})
+    assert "FilterTest Cola" in [product["name"] for product in response.json()["discountedProducts"]]
+
+    # Categories include their subcategories and may be repeated or comma-separated
+    assert store_names(client, title="FilterTest", category="filter-drinks", sort="name") == \
+        ["FilterTest Cola", "FilterTest Juice"]
+    assert store_names(client, title="FilterTest", categories=f"filter-juice,{snacks}", sort="name") == \
+        ["FilterTest Chips", "FilterTest Juice"]
+
+
+def test_failed_statement_does_not_skew_query_timing(db_session: Session):
+    """Test that a statement that errors doesn't leave its start time behind for the next one."""
+    connection = db_session.connection()
+    started = connection.info.setdefault("query_started", [])
+    depth = len(started)
+    with pytest.raises(Exception):
+        with connection.begin_nested():
+            connection.exec_driver_sql("SELECT * FROM no_such_table")
+    assert len(started) == depth
@@ -0,0 +1,86 @@
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from core.search import PrefixIndex
+
+
+def test_prefix_index_suggest():
+    """Test that suggestions match any word start and rank by popularity."""
+    index = PrefixIndex()
+    index.load([
+        ("product", 1, "Fresh Apple", "fresh-apple", 5.0),
+        ("product", 2, "Apple Juice", "apple-juice", 9.0),
+        ("product", 3, "Banana", "banana", 7.0),
+        ("category", 10, "Apples & Pears", "apples-pears", 1.0),
+    ])
+
+    assert [entry["id"] for entry in index.suggest("app")] == [2, 1, 10]
+    assert [entry["id"] for entry in index.suggest("APP", limit=1)] == [2]
+    assert index.suggest("juice")[0] == {"type": "product", "id": 2, "name": "Apple Juice", "slug": "apple-juice"}
+    assert index.suggest("kiwi") == []
+
+    # Writes take effect straight away
+    index.set_popularity("product", 1, 20.0)
+    index.remove("product", 2)
+    index.upsert("product", 4, "Applesauce", "applesauce", 0.0)
+    assert [entry["id"] for entry in index.suggest("app")] == [1, 10, 4]
+
+
+def test_suggest_endpoint(client: TestClient, db_session: Session, make_product):
+    """Test that newly created products show up in suggestions."""
+    make_product("Suggestible Quince", price=2.5)
+
+    response = client.get("/products/suggest", params={"q": "sugges"})
+    assert response.status_code == 200
+    assert "Suggestible Quince" in [entry["name"] for entry in response.json()["suggestions"]]
+
+
+def test_prefix_index_fuzzy():
+    """Test that fuzzy search tolerates typos, needs every word and ranks by similarity."""
+    index = PrefixIndex()
+    index.load([
+        ("product", 1, "Organic Strawberry Jam", "organic-strawberry-jam", 1.0),
+        ("product", 2, "Strawberry Yogurt", "strawberry-yogurt", 3.0),
+        ("product", 3, "Blueberry Muffin", "blueberry-muffin", 9.0),
+        ("category", 10, "Strawberries", "strawberries", 50.0),
+    ])
+
+    # Categories are never search results; equally similar products go most popular first
+    assert [entry["id"] for entry in index.fuzzy("strawbery")] == [2, 1]
+    assert [entry["id"] for entry in index.fuzzy("strawbery jam")] == [1]
+    assert [entry["id"] for entry in index.fuzzy("bluebery mufin")] == [3]
+    assert index.fuzzy("strawberry muffin") == []
+    assert index.fuzzy("xyzzy") == []
+
+
+def test_search_endpoint_and_store_title_fallback(client: TestClient, db_session: Session, make_product):
+    """Test typo-tolerant search, and the store listing falling back to it when a title has no exact match."""
+    make_product("Pomegranate Molasses", price=6.0)
+
+    response = client.get("/products/search", params={"q": "pomegrante"})
+    assert response.status_code == 200
+    assert [product["name"] for product in response.json()["products"]] == ["Pomegranate Molasses"]
+
+    response = client.get("/products/store", params={"title": "pomegrante molases"})
+    assert response.status_code == 200
+    assert [product["name"] for product in response.json()["products"]] == ["Pomegranate Molasses"]
+
+
+def test_store_title_fallback_applies_filters_and_sort(client: TestClient, db_session: Session, make_product):
+    """Test that the typo-tolerant fallback finds matches within the filters even below the global top results."""
+    for i in range(3):
+        make_product(f"Tamarind Paste {i}", price=3.0)
+    make_product("Tamarind Paste Deluxe", price=9.0, discounted_price=7.0)
+    make_product("Tamarind Paste Mild", price=5.0, discounted_price=4.0)
+
+    response = client.get("/products/store", params={"title": "tamarnd paste", "discounted_only": True, "limit": 2})
+    assert response.status_code == 200
+    assert [product["name"] for product in response.json()["products"]] == ["Tamarind Paste Mild", "Tamarind Paste Deluxe"]
+
+    response = client.get("/products/store", params={"title": "tamarnd paste", "discounted_only": True,
+                                                     "sort": "price_asc", "limit": 2})
+    assert [product["name"] for product in response.json()["products"]] == ["Tamarind Paste Mild", "Tamarind Paste Deluxe"]
+
+    response = client.get("/products/store", params={"title": "tamarnd paste", "discounted_only": True,
+                                                     "sort": "name", "limit": 2})
+    assert [product["name"] for product in response.json()["products"]] == ["Tamarind Paste Deluxe", "Tamarind Paste Mild"]
@@ -0,0 +1,52 @@
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from core.cache import VersionedCache, bump_version
+from core.config import settings
+from database.seed import seed_global_settings
+
+
+def test_versioned_cache_rebuilds_on_version_bump(db_session: Session, monkeypatch):
+    """Test that a cache rebuilds when another writer bumps its version row."""
+    monkeypatch.setattr(settings, "CACHE_VERSION_CHECK_SECONDS", 0)
+    builds = []
+
+    def load(db):
+        builds.append(1)
+        return {"build": len(builds)}
+
+    cache = VersionedCache("test_dataset", load)
+    first = cache.get(db_session)
+    assert cache.get(db_session) is first
+    assert first.data == {"build": 1}
+
+    # Another worker writes: only the version row changes, nothing calls refresh()
+    bump_version(db_session, "test_dataset")
+    db_session.commit()
+    second = cache.get(db_session)
+    assert second.data == {"build": 2}
+    assert second.etag != first.etag
+    assert cache.get(db_session) is second
+    assert len(builds) == 2
+
+
+def test_settings_etag_and_update(client: TestClient, db_session: Session, admin_headers, monkeypatch):
+    """Test that settings answer 304 for a current ETag and change after an update."""
+    monkeypatch.setattr(settings, "CACHE_VERSION_CHECK_SECONDS", 0)
+    seed_global_settings(db_session)
+    db_session.commit()
+
+    response = client.get("/setting/global/all")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+
+    response = client.get("/setting/global/all", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    response = client.put("/setting/global", json={"default_timezone": "Europe/Paris"}, headers=admin_headers)
+    assert response.status_code == 200
+
+    response = client.get("/setting/global/all", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["default_timezone"] == "Europe/Paris"
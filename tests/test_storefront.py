@@ -0,0 +1,53 @@
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from database.seed import seed_attributes, seed_languages
+
+
+def test_seeded_languages_and_attributes_follow_writes(client: TestClient, db_session: Session, admin_headers, monkeypatch):
+    """Test that the cached storefront lists hold the seeded rows and pick up admin writes."""
+    monkeypatch.setattr(settings, "CACHE_VERSION_CHECK_SECONDS", 0)
+    seed_languages(db_session)
+    seed_attributes(db_session)
+    db_session.commit()
+
+    codes = {language["code"] for language in client.get("/language/show").json()}
+    assert {"en", "es"} <= codes
+    slugs = {attribute["slug"] for attribute in client.get("/attributes/show").json()}
+    assert {"size", "color"} <= slugs
+
+    response = client.post("/language/", json={"name": "French", "code": "fr"}, headers=admin_headers)
+    assert response.status_code == 201
+    codes = {language["code"] for language in client.get("/language/show").json()}
+    assert "fr" in codes
+
+    response = client.post("/attributes/", json={"name": "Weight", "slug": "weight"}, headers=admin_headers)
+    assert response.status_code == 201
+    slugs = {attribute["slug"] for attribute in client.get("/attributes/show").json()}
+    assert "weight" in slugs
+
+
+def test_bootstrap_payload(client: TestClient, db_session: Session, admin_headers, monkeypatch):
+    """Test that /bootstrap carries every storefront fragment and revalidates with its ETag."""
+    monkeypatch.setattr(settings, "CACHE_VERSION_CHECK_SECONDS", 0)
+    seed_languages(db_session)
+    db_session.commit()
+
+    response = client.get("/bootstrap")
+    assert response.status_code == 200
+    payload = response.json()
+    assert set(payload) == {"storeSetting", "globalSetting", "languages", "categories", "coupons", "attributes"}
+    assert payload["languages"] == client.get("/language/show").json()
+    etag = response.headers["etag"]
+
+    response = client.get("/bootstrap", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    # A change to any fragment changes the payload and its ETag
+    response = client.post("/language/", json={"name": "German", "code": "de"}, headers=admin_headers)
+    assert response.status_code == 201
+    response = client.get("/bootstrap", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert "de" in {language["code"] for language in response.json()["languages"]}
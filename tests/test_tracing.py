@@ -0,0 +1,54 @@
+import json
+import os
+
+from fastapi.testclient import TestClient
+
+from core import tracing
+from core.config import settings
+
+
+class CollectingExporter(tracing.SpanExporter):
+    def __init__(self):
+        self.traces = []
+
+    def export(self, trace):
+        self.traces.append(trace)
+
+
+def test_traceparent_followed_only_when_tracing_is_on(client: TestClient, monkeypatch):
+    """Test that clients can't switch tracing on, and that a sampled parent is followed once it is."""
+    monkeypatch.setattr(settings, "TRACE_SAMPLE_RATE", 0.0)
+    monkeypatch.setattr(settings, "TRACE_FOLLOW_PARENT", False)
+    exporter = CollectingExporter()
+    monkeypatch.setattr(tracing, "_exporter", exporter)
+    trace_id, parent_id = "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7"
+
+    client.get("/products/show", headers={"traceparent": f"00-{trace_id}-{parent_id}-01"})
+    assert exporter.traces == []
+
+    monkeypatch.setattr(settings, "TRACE_FOLLOW_PARENT", True)
+    client.get("/products/show")
+    client.get("/products/show", headers={"traceparent": f"00-{trace_id}-{parent_id}-00"})
+    assert exporter.traces == []
+
+    client.get("/products/show", headers={"traceparent": f"00-{trace_id}-{parent_id}-01"})
+    [trace] = exporter.traces
+    assert trace.trace_id == trace_id
+    root = next(span for span in trace.spans if span.parent_id == parent_id)
+    assert root.name == "GET /products/show"
+    assert root.attributes["http.status_code"] == 200
+
+
+def test_json_lines_exporter_rotates(tmp_path):
+    """Test that the trace file is rotated once it passes max_bytes, keeping one previous file."""
+    path = str(tmp_path / "traces.jsonl")
+    exporter = tracing.JsonLinesExporter(path, "flat", max_bytes=1)
+
+    for name in ("first", "second"):
+        trace = tracing.Trace()
+        tracing.Span(trace, name, None, tracing.SPAN_KIND_SERVER, {}).end()
+        exporter._write(trace)
+
+    with open(path + ".1") as f:
+        assert [json.loads(line)["name"] for line in f] == ["second"]
+    assert not os.path.exists(path)
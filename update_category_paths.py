@@ -0,0 +1,41 @@
+from sqlalchemy import inspect, text
+import sys
+import os
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.database import engine, SessionLocal
+from database.seed import backfill_category_paths
+
+def update_categories_table():
+    """Add the materialized path columns to categories and fill them in"""
+    with engine.begin() as conn:
+        # Check if columns exist before adding them
+        inspector = inspect(engine)
+        columns = [col['name'] for col in inspector.get_columns('categories')]
+        
+        if 'path' not in columns:
+            conn.execute(text('ALTER TABLE categories ADD COLUMN path VARCHAR(255) DEFAULT NULL'))
+            print("Added 'path' column to categories table")
+        
+        if 'depth' not in columns:
+            conn.execute(text('ALTER TABLE categories ADD COLUMN depth INTEGER NOT NULL DEFAULT 0'))
+            print("Added 'depth' column to categories table")
+        
+        index_sql = 'CREATE INDEX IF NOT EXISTS ix_categories_path ON categories (path)'
+        if engine.dialect.name == 'postgresql':
+            index_sql = 'CREATE INDEX IF NOT EXISTS ix_categories_path ON categories (path varchar_pattern_ops)'
+        conn.execute(text(index_sql))
+    
+    db = SessionLocal()
+    try:
+        backfill_category_paths(db)
+        db.commit()
+        print("Category paths backfilled")
+    finally:
+        db.close()
+    
+    print("Database schema update completed successfully.")
+
+if __name__ == "__main__":
+    update_categories_table()
@@ -0,0 +1,47 @@
+from sqlalchemy import inspect, text
+import sys
+import os
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.database import engine
+from models.product import DISCOUNT_PERCENTAGE_SQL
+
+PRODUCT_INDEXES = {
+    "ix_products_availability_created_at": "availability, created_at, id",
+    "ix_products_availability_price": "availability, price, id",
+    "ix_products_availability_discount": "availability, discount_percentage, id",
+    "ix_products_availability_name": "availability, name, id",
+    "ix_products_category_availability_price": "category_id, availability, price",
+}
+
+def update_products_table():
+    """Add the generated discount_percentage column and the store listing sort indexes"""
+    with engine.begin() as conn:
+        # Check if columns exist before adding them
+        inspector = inspect(engine)
+        columns = [col['name'] for col in inspector.get_columns('products')]
+        
+        if 'discount_percentage' not in columns:
+            # SQLite can only add VIRTUAL generated columns with ALTER TABLE
+            storage = 'STORED' if engine.dialect.name == 'postgresql' else 'VIRTUAL'
+            conn.execute(text(
+                f'ALTER TABLE products ADD COLUMN discount_percentage INTEGER '
+                f'GENERATED ALWAYS AS ({DISCOUNT_PERCENTAGE_SQL}) {storage}'
+            ))
+            print("Added 'discount_percentage' column to products table")
+        
+        for name, columns_sql in PRODUCT_INDEXES.items():
+            conn.execute(text(f'CREATE INDEX IF NOT EXISTS {name} ON products ({columns_sql})'))
+            print(f"Ensured '{name}' index on products table")
+        
+        # Typo-tolerant search uses pg_trgm on Postgres
+        if engine.dialect.name == 'postgresql':
+            conn.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+            conn.execute(text('CREATE INDEX IF NOT EXISTS ix_products_name_trgm ON products USING gin (name gin_trgm_ops)'))
+            print("Ensured 'ix_products_name_trgm' index on products table")
+    
+    print("Database schema update completed successfully.")
+
+if __name__ == "__main__":
+    update_products_table()
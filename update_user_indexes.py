@@ -0,0 +1,23 @@
+from sqlalchemy import text
+import sys
+import os
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.database import engine
+
+def update_user_indexes():
+    """Add the case-insensitive unique indexes used for login and signup conflict checks"""
+    # Expression indexes aren't reflected reliably by the inspector, so rely on IF NOT EXISTS.
+    # Existing rows that only differ by case must be merged by hand before this can succeed.
+    with engine.begin() as conn:
+        conn.execute(text('CREATE UNIQUE INDEX IF NOT EXISTS ix_users_email_lower ON users (lower(email))'))
+        print("Ensured 'ix_users_email_lower' index on users table")
+        
+        conn.execute(text('CREATE UNIQUE INDEX IF NOT EXISTS ix_users_username_lower ON users (lower(username))'))
+        print("Ensured 'ix_users_username_lower' index on users table")
+    
+    print("Database schema update completed successfully.")
+
+if __name__ == "__main__":
+    update_user_indexes()